@@ -0,0 +1,29 @@
+"""Reloading an unchanged file: load_path() versus ZmlCache hits."""
+import os
+import sys
+import tempfile
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+
+
+def main(sections: int = 2000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.zml')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(make_document(sections))
+        print(f'document: {os.path.getsize(path) / 1e6:.1f} MB')
+        base = best_of(lambda: zml.load_path(path))
+        print(f'{"load_path":>24}: {base * 1e3:8.2f} ms')
+        cases = [('copy', {}), ('frozen', {'policy': 'frozen'}),
+                 ('shared', {'policy': 'shared'}),
+                 ('copy + verify_hash', {'verify_hash': True})]
+        for name, kw in cases:
+            cache = zml.ZmlCache(**kw)
+            cache.load(path)
+            t = best_of(lambda: cache.load(path))
+            print(f'{name:>24}: {t * 1e3:8.2f} ms ({base / t:.0f}x)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,31 @@
+"""Syntax checking with validate()/is_valid() against a full load.
+
+is_valid() only matches the tags and the tokens of the values, it neither
+converts nor stores them.
+"""
+import io
+import sys
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+
+
+def main(sections: int = 5000) -> None:
+    s = make_document(sections)
+    b = s.encode()
+    print(f'{sections} sections, {len(s) / 1e6:.1f} MB')
+    assert zml.is_valid(s) and zml.is_valid(b)
+    cases = [
+        ('loads', lambda: zml.loads(s)),
+        ('loads, indexed', lambda: zml.loads(s, 'indexed')),
+        ('loads, bytes', lambda: zml.loads(b, 'bytes')),
+        ('is_valid', lambda: zml.is_valid(s)),
+        ('is_valid, bytes', lambda: zml.is_valid(b)),
+        ('validate', lambda: zml.validate(io.StringIO(s))),
+    ]
+    for name, fn in cases:
+        print(f'{name:>16}: {best_of(fn, repeat=7) * 1000:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,79 @@
+"""Decoding a typed config with compile_loader() against load-then-convert.
+
+The config is a dict of dataclasses.  The baseline loads the document into
+dicts and lists and then converts them, either with a generic converter
+driven by the type hints or with hand-written constructor calls.
+"""
+import dataclasses
+import sys
+import typing
+from typing import Any, Dict, List, Optional
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+
+
+@dataclasses.dataclass
+class Limits:
+    cpu: int
+    memory: int
+    ratio: float
+
+
+@dataclasses.dataclass
+class Section:
+    name: str
+    enabled: bool
+    port: int
+    timeout: float
+    owner: Optional[str]
+    hosts: List[str]
+    limits: Limits
+    tags: List[Any] = dataclasses.field(default_factory=list)
+
+
+Config = Dict[str, Section]
+
+
+def convert(t, value):
+    """Build a value of type ``t`` from a loaded value, guided by the hints."""
+    if dataclasses.is_dataclass(t):
+        hints = typing.get_type_hints(t)
+        return t(**{k: convert(hints[k], v) for k, v in value.items()})
+    origin = getattr(t, '__origin__', None)
+    if origin is list:
+        return [convert(t.__args__[0], v) for v in value]
+    if origin is dict:
+        return {k: convert(t.__args__[1], v) for k, v in value.items()}
+    return value
+
+
+def by_hand(d):
+    return {k: Section(v['name'], v['enabled'], v['port'], v['timeout'],
+                       v['owner'], v['hosts'], Limits(**v['limits']),
+                       v['tags'])
+            for k, v in d.items()}
+
+
+def main(sections: int = 5000) -> None:
+    s = make_document(sections)
+    print(f'{sections} sections, {len(s) / 1e6:.1f} MB')
+    loader = zml.compile_loader(Config)
+    expected = convert(Config, zml.loads(s))
+    assert loader(s) == expected == by_hand(zml.loads(s))
+    cases = [
+        ('loads', lambda: zml.loads(s)),
+        ('loads + generic convert', lambda: convert(Config, zml.loads(s))),
+        ('loads + hand-written', lambda: by_hand(zml.loads(s))),
+        ('compile_loader', lambda: loader(s)),
+        ('compile_loader (cached)',
+         lambda: zml.compile_loader(Config)(s)),
+    ]
+    for name, fn in cases:
+        print(f'{name:>24}: {best_of(fn, repeat=7) * 1000:7.1f} ms')
+    t = best_of(lambda: zml.schema._Compiler().compile(Config), repeat=3)
+    print(f'{"compiling the loader":>24}: {t * 1000:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
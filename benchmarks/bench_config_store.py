@@ -0,0 +1,42 @@
+"""ConfigStore: lock-free reads, and the cost of a reload after a change."""
+import os
+import sys
+import tempfile
+import time
+
+from common import best_of, make_config
+import zen_markup_lang as zml
+
+
+def main(sections: int = 2000) -> None:
+    config = make_config(sections)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.zml')
+        with open(path, 'w') as f:
+            zml.dump(config, f)
+        print(f'document: {os.path.getsize(path) / 1e6:.1f} MB')
+        store = zml.ConfigStore(path)
+        n = 100000
+        t = best_of(lambda: [store.get('section_7.limits.cpu')
+                             for _ in range(n)])
+        print(f'{"get()":>22}: {t / n * 1e9:8.0f} ns')
+        t = best_of(lambda: store.reload())
+        print(f'{"unchanged reload()":>22}: {t * 1e6:8.0f} us')
+        notified = []
+        store.subscribe('section_7', lambda old, new: notified.append(new))
+        best = float('inf')
+        for i in range(3):
+            config['section_7']['port'] = i
+            with open(path, 'w') as f:
+                zml.dump(config, f)
+            t = time.perf_counter()
+            store.reload()
+            best = min(best, time.perf_counter() - t)
+        print(f'{"changed reload()":>22}: {best * 1e3:8.1f} ms '
+              f'({len(notified)} notifications)')
+        t = best_of(lambda: zml.load_path(path))
+        print(f'{"load_path()":>22}: {t * 1e3:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,28 @@
+"""Loading a file with and without the persistent on-disk cache."""
+import os
+import sys
+import tempfile
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+
+
+def main(sections: int = 5000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.zml')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(make_document(sections))
+        print(f'document: {os.path.getsize(path) / 1e6:.1f} MB')
+        base = best_of(lambda: zml.load_path(path), repeat=3)
+        print(f'{"load_path":>20}: {base * 1e3:8.1f} ms')
+        for engine in ('ply', 'scanner'):
+            with open(path, encoding='utf-8') as f:
+                t = best_of(lambda: zml.load(f, engine), repeat=1)
+            print(f'{"load " + engine:>20}: {t * 1e3:8.1f} ms')
+        zml.load_path(path, cache=True)
+        t = best_of(lambda: zml.load_path(path, cache=True), repeat=3)
+        print(f'{"cache hit":>20}: {t * 1e3:8.1f} ms ({base / t:.0f}x)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
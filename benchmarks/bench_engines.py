@@ -0,0 +1,20 @@
+"""Full load time of a large document with each tokenizer engine."""
+import sys
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+
+
+def main(sections: int = 20000) -> None:
+    s = make_document(sections)
+    print(f'document: {len(s) / 1e6:.1f} MB')
+    base = None
+    for engine in ('ply', 'scanner', 'indexed'):
+        t = best_of(lambda: zml.loads(s, engine), repeat=3)
+        base = base or t
+        print(f'{engine:>8}: {t * 1e3:8.1f} ms, {len(s) / t / 1e6:5.1f} MB/s '
+              f'({base / t:.2f}x)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,39 @@
+"""Cost of error reporting on successful and failing parses.
+
+Successful parses must not pay for positions at all; a failing parse pays
+for locating the error, and line and column are only computed when they
+are read.
+"""
+import sys
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+
+
+def main(sections: int = 2000) -> None:
+    s = make_document(sections)
+    lines = s.count('\n')
+    # a bad value near the end, and an end tag that does not match
+    bad_value = s[:-40] + ' 1x ' + s[-40:]
+    cut = s.rindex('</name>')
+    bad_tag = s[:cut] + '</nope>' + s[cut + 7:]
+    print(f'{len(s) / 1e6:.1f} MB, {lines} lines')
+    for engine in ('scanner', 'indexed', 'bytes', 'ply'):
+        t = best_of(lambda: zml.loads(s, engine), repeat=3)
+        print(f'{engine:>8} ok:        {t * 1000:7.1f} ms')
+        for name, doc in (('bad value', bad_value), ('bad tag', bad_tag)):
+            def fail():
+                try:
+                    zml.loads(doc, engine)
+                except RuntimeError as e:
+                    return e
+            t = best_of(fail, repeat=3)
+            e = fail()
+            t_pos = best_of(lambda: (e.lineno, e.colno) if hasattr(
+                e, 'colno') else None, repeat=1)
+            print(f'{engine:>8} {name + ":":<10} {t * 1000:7.1f} ms, '
+                  f'position {t_pos * 1000:.2f} ms: {e}')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,72 @@
+"""Throughput of string escaping (dump) and unescaping (load).
+
+The per-character implementations that were replaced are kept here as a
+reference point.
+"""
+import random
+import sys
+
+from common import best_of
+from zen_markup_lang.lexer import escaping, unescape
+from zen_markup_lang.zml import to_zml_str
+
+
+def old_to_zml_str(s: str) -> str:
+    a = ['"']
+    for i in s:
+        if i == '\\':
+            a.append('\\\\')
+        elif i == '\n':
+            a.append('\\n')
+        elif i == '\t':
+            a.append('\\t')
+        elif i == '\b':
+            a.append('\\b')
+        elif i == '\r':
+            a.append('\\r')
+        elif i == '"':
+            a.append('\\"')
+        else:
+            a.append(i)
+    a.append('"')
+    return ''.join(a)
+
+
+def old_unescape(s: str) -> str:
+    builder = []
+    i = 0
+    while True:
+        j = s.find('\\', i)
+        if j == -1:
+            builder.append(s[i:])
+            break
+        builder.append(s[i:j])
+        builder.append(escaping[s[j+1]])
+        i = j + 2
+    return ''.join(builder)
+
+
+CORPORA = {
+    'ascii': 'the quick brown fox jumps over the lazy dog 0123456789',
+    'cjk': '中文日本語한국어 ',
+    'emoji': '\U0001f600\U0001f680\U0001f4a9 ok ',
+    'escapes': 'path\\to\\file "quoted"\n\tline\r\n',
+}
+
+
+def main(size: int = 1 << 22) -> None:
+    rnd = random.Random(0)
+    for name, pool in CORPORA.items():
+        s = ''.join(rnd.choice(pool) for _ in range(size))
+        escaped = to_zml_str(s)[1:-1]
+        mb = len(s) / 1e6
+        for label, fn in (('dump old', lambda: old_to_zml_str(s)),
+                          ('dump new', lambda: to_zml_str(s)),
+                          ('load old', lambda: old_unescape(escaped)),
+                          ('load new', lambda: unescape(escaped))):
+            t = best_of(fn, repeat=3)
+            print(f'{name:>8} {label}: {mb / t:8.1f} M chars/s')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,50 @@
+"""Import time of the package, as reported by ``python -X importtime``.
+
+``python bench_import.py zen_markup_lang 20 30`` fails if the best import
+takes more than 30 ms, to catch modules that are imported eagerly again.
+"""
+import os
+import re
+import subprocess
+import sys
+
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+
+def import_times(module: str) -> dict:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.join(os.path.dirname(__file__), '..', 'src')]
+        + env.get('PYTHONPATH', '').split(os.pathsep))
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                          f'import {module}'],
+                         env=env, stderr=subprocess.PIPE,
+                         universal_newlines=True, check=True).stderr
+    times = {}
+    for line in out.splitlines():
+        m = _LINE.match(line)
+        if m:
+            times[m.group(4)] = int(m.group(2))
+    return times
+
+
+def main(module: str = 'zen_markup_lang', runs: int = 20,
+         max_ms: float = 0) -> None:
+    """Print the best import times; exit with an error above ``max_ms``."""
+    runs = int(runs)
+    samples = [import_times(module) for _ in range(runs)]
+    best = {}
+    for times in samples:
+        for name, us in times.items():
+            best[name] = min(best.get(name, us), us)
+    print(f'best cumulative import time over {runs} runs (us)')
+    for name, us in sorted(best.items(), key=lambda x: -x[1]):
+        if name.startswith(module) or name == module:
+            print(f'{us:8d}  {name}')
+    if float(max_ms) and best[module] > float(max_ms) * 1000:
+        sys.exit(f'{module} took {best[module] / 1000:.1f} ms to import, '
+                 f'more than {max_ms} ms')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
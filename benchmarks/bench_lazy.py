@@ -0,0 +1,26 @@
+"""Cold load of a large document, eager versus lazy, then a few lookups."""
+import sys
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+
+
+def main(sections: int = 100000) -> None:
+    s = make_document(sections)
+    print(f'document: {len(s) / 1e6:.1f} MB')
+    t_full = best_of(lambda: zml.loads(s), repeat=3)
+    t_lazy = best_of(lambda: zml.loads(s, lazy=True), repeat=3)
+
+    def lazy_lookup():
+        d = zml.loads(s, lazy=True)
+        for i in range(0, sections, sections // 5):
+            d[f'section_{i}']['limits']['cpu']
+
+    t_look = best_of(lazy_lookup, repeat=3)
+    print(f'       full load: {t_full * 1e3:8.1f} ms')
+    print(f'       lazy load: {t_lazy * 1e3:8.1f} ms ({t_full / t_lazy:.1f}x)')
+    print(f'lazy + 5 lookups: {t_look * 1e3:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
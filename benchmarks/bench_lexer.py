@@ -0,0 +1,32 @@
+"""Tokens per second of the PLY lexer and the hand-written scanner."""
+import sys
+
+from common import best_of, make_document
+from zen_markup_lang.lexer import Lexer
+from zen_markup_lang.scanner import Scanner
+
+
+def count_tokens(lexer, s: str) -> int:
+    lexer.input(s)
+    get_token = lexer.get_token
+    eof = Lexer.Token.EOF
+    n = 0
+    while get_token()[1] is not eof:
+        n += 1
+    return n
+
+
+def main(sections: int = 20000) -> None:
+    s = make_document(sections)
+    n = count_tokens(Scanner(), s)
+    print(f'document: {len(s) / 1e6:.1f} MB, {n} tokens')
+    results = {}
+    for name, cls in (('ply', Lexer), ('scanner', Scanner)):
+        t = best_of(lambda: count_tokens(cls(), s), repeat=3)
+        results[name] = n / t
+        print(f'{name:>8}: {n / t / 1e6:6.2f} M tokens/s')
+    print(f' speedup: {results["scanner"] / results["ply"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,43 @@
+"""Scaling of load_many() with the number of workers.
+
+Writes ``files`` documents to a temporary directory and loads them with a
+plain loop, then with thread and process pools of 1, 2, 4, ... workers up
+to the number of cores.
+"""
+import os
+import sys
+import tempfile
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+
+
+def main(files: int = 400, sections: int = 50) -> None:
+    s = make_document(sections)
+    cores = os.cpu_count() or 1
+    print(f'{files} files of {len(s) / 1e3:.0f} kB, {cores} cores')
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(files):
+            paths.append(os.path.join(tmp, f'{i}.zml'))
+            with open(paths[-1], 'w') as f:
+                f.write(s)
+
+        def loop():
+            for path in paths:
+                with open(path) as f:
+                    zml.load(f)
+
+        base = best_of(loop, repeat=3)
+        print(f'{"sequential":>16}: {base * 1e3:8.1f} ms')
+        counts = sorted({1 << i for i in range(cores.bit_length())} | {cores})
+        for executor in ('thread', 'process'):
+            for n in counts:
+                t = best_of(lambda: list(zml.load_many(
+                    paths, workers=n, executor=executor)), repeat=3)
+                print(f'{executor:>8} x {n:<5}: {t * 1e3:8.1f} ms '
+                      f'({base / t:.1f}x)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
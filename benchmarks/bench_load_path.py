@@ -0,0 +1,55 @@
+"""Peak memory and time of load() versus the memory-mapped load_path().
+
+Each case runs in a fresh interpreter so that its peak RSS (VmHWM, Linux
+only) is not inflated by the previous ones.  The ``parse`` cases use
+``include=[]``, which steps over everything, to show the reading cost
+without the size of the result.  The mapped pages of ``load_path`` count
+towards its RSS but are file-backed: shared with other processes mapping
+the same file and reclaimable by the kernel.  The default ``load`` streams
+its input in chunks; ``'indexed'`` shows the cost of a whole-text read.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import make_document
+
+CASES = {
+    'load': 'with open(path, encoding="utf-8") as f: zml.load(f{kw})',
+    'load indexed': 'with open(path, encoding="utf-8") as f: '
+                    'zml.load(f, "indexed"{kw})',
+    'load_path': 'zml.load_path(path{kw})',
+}
+
+SCRIPT = '''
+import time, zen_markup_lang as zml
+path = {path!r}
+t = time.perf_counter()
+{stmt}
+t = time.perf_counter() - t
+with open('/proc/self/status') as f:
+    hwm = next(line.split()[1] for line in f if line.startswith('VmHWM'))
+print(t, hwm)
+'''
+
+
+def main(sections: int = 40000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'doc.zml')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(make_document(sections))
+        print(f'document: {os.path.getsize(path) / 1e6:.1f} MB')
+        for kw in ('', ', include=[]'):
+            for name, stmt in CASES.items():
+                script = SCRIPT.format(path=path, stmt=stmt.format(kw=kw))
+                out = subprocess.run([sys.executable, '-c', script],
+                                     check=True, capture_output=True,
+                                     text=True).stdout.split()
+                label = name + (' (skip all)' if kw else '')
+                print(f'{label:>25}: {float(out[0]) * 1e3:8.1f} ms, '
+                      f'peak RSS {int(out[1]) / 1e3:6.1f} MB')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
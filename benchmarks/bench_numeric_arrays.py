@@ -0,0 +1,33 @@
+"""Loading large numeric arrays as lists versus packed arrays."""
+import random
+import sys
+import tracemalloc
+
+from common import best_of
+import zen_markup_lang as zml
+
+
+def main(n: int = 200000) -> None:
+    rnd = random.Random(0)
+    s = zml.dumps({'ints': [rnd.randrange(1 << 40) for _ in range(n)],
+                   'floats': [rnd.randrange(1, 10 ** 6) / 1000
+                              for _ in range(n)]})
+    print(f'document: {len(s) / 1e6:.1f} MB, {2 * n} numbers')
+    modes = [None, 'array']
+    try:
+        import numpy  # noqa: F401
+        modes.append('numpy')
+    except ImportError:
+        pass
+    for mode in modes:
+        t = best_of(lambda: zml.loads(s, numeric_arrays=mode), repeat=3)
+        tracemalloc.start()
+        d = zml.loads(s, numeric_arrays=mode)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del d
+        print(f'{str(mode):>6}: {t * 1e3:8.1f} ms, result {size / 1e6:6.1f} MB')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
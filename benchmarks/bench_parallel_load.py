@@ -0,0 +1,28 @@
+"""Parsing one large document with loads_parallel() on 1, 2, 4, ... cores."""
+import os
+import sys
+import time
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+from zen_markup_lang.batch import _split
+
+
+def main(sections: int = 40000) -> None:
+    s = make_document(sections)
+    cores = os.cpu_count() or 1
+    print(f'document: {len(s) / 1e6:.1f} MB, {cores} cores')
+    base = best_of(lambda: zml.loads(s), repeat=3)
+    print(f'{"loads":>12}: {base * 1e3:8.1f} ms')
+    t = time.perf_counter()
+    _split(s, max(cores, 2))
+    print(f'{"split":>12}: {(time.perf_counter() - t) * 1e3:8.1f} ms')
+    counts = sorted({1 << i for i in range(1, cores.bit_length())} | {cores, 2})
+    for n in counts:
+        t = best_of(lambda: zml.loads_parallel(s, n, min_part_size=1),
+                    repeat=3)
+        print(f'{n:>4} workers: {t * 1e3:8.1f} ms ({base / t:.1f}x)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,97 @@
+"""The iterative ZmlReader against the recursive reader it replaced."""
+import sys
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+from zen_markup_lang.lexer import Lexer
+from zen_markup_lang.scanner import Scanner
+
+
+class RecursiveReader:
+    _TERMINATORS = {Lexer.Token.BOOL, Lexer.Token.INT,
+                    Lexer.Token.FLOAT, Lexer.Token.NULL, Lexer.Token.STRING,
+                    Lexer.Token.EMPTY_ARR, Lexer.Token.EMPTY_OBJ}
+
+    def __init__(self, s):
+        self._lexer = Scanner()
+        self._lexer.input(s)
+
+    def _read_next(self, key):
+        content, kind = self._lexer.get_token()
+        if kind in RecursiveReader._TERMINATORS:
+            content2, kind2 = self._lexer.get_token()
+            if kind == Lexer.Token.STRING:
+                while kind2 == Lexer.Token.STRING:
+                    content += content2
+                    content2, kind2 = self._lexer.get_token()
+            if content2 != key or kind2 != Lexer.Token.END_TAG:
+                raise RuntimeError()
+            ret = content
+        elif kind == Lexer.Token.START_TAG:
+            if content != '':
+                ret, end_tag = self._read_object(content)
+            else:
+                ret, end_tag = self._read_array()
+            if end_tag != key:
+                raise RuntimeError()
+        else:
+            raise RuntimeError()
+        return ret
+
+    def _read_object(self, first_key):
+        ret = {first_key: self._read_next(first_key)}
+        while True:
+            content, kind = self._lexer.get_token()
+            if kind == Lexer.Token.START_TAG:
+                ret[content] = self._read_next(content)
+            elif kind == Lexer.Token.END_TAG:
+                return (ret, content)
+            elif kind == Lexer.Token.EOF:
+                return (ret, '')
+            else:
+                raise RuntimeError()
+
+    def _read_array(self):
+        ret = [self._read_next('')]
+        while True:
+            content, kind = self._lexer.get_token()
+            if kind == Lexer.Token.START_TAG:
+                if content != '':
+                    raise RuntimeError()
+                ret.append(self._read_next(''))
+            elif kind == Lexer.Token.END_TAG:
+                return (ret, content)
+            elif kind == Lexer.Token.EOF:
+                return (ret, '')
+            else:
+                raise RuntimeError()
+
+    def read(self):
+        content, kind = self._lexer.get_token()
+        if kind != Lexer.Token.START_TAG:
+            raise RuntimeError()
+        return self._read_object(content)[0]
+
+
+def make_deep(count: int, depth: int) -> str:
+    one = '<a><>' * depth + ' 1 ' + '</></a>' * depth
+    return ''.join(f'<k{i}>{one}</k{i}>\n' for i in range(count))
+
+
+def main(sections: int = 5000) -> None:
+    docs = {'wide': make_document(sections),
+            'deep': make_deep(sections // 10, 60)}
+    for name, s in docs.items():
+        assert RecursiveReader(s).read() == zml.loads(s)
+        t_rec = best_of(lambda: RecursiveReader(s).read(), repeat=3)
+        t_it = best_of(lambda: zml.loads(s), repeat=3)
+        print(f'{name:>5}: recursive {t_rec * 1e3:7.1f} ms, '
+              f'iterative {t_it * 1e3:7.1f} ms ({t_rec / t_it:.2f}x)')
+    s = '<a>' * 100000 + ' 1 ' + '</a>' * 100000
+    t = best_of(lambda: zml.loads(s), repeat=1)
+    print(f'100000 levels: iterative {t * 1e3:.1f} ms '
+          '(the recursive reader raises RecursionError)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
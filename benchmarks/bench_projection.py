@@ -0,0 +1,27 @@
+"""Loading one section of a large document versus loading all of it."""
+import sys
+from io import StringIO
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+
+
+def main(sections: int = 20000) -> None:
+    s = make_document(sections)
+    print(f'document: {len(s) / 1e6:.1f} MB')
+    target = f'section_{sections // 2}'
+    cases = {
+        'full load': {},
+        f'include {target}.limits': {'include': [f'{target}.limits']},
+        'exclude *.hosts': {'exclude': [f'section_{i}.hosts'
+                                        for i in range(sections)]},
+    }
+    base = None
+    for name, kw in cases.items():
+        t = best_of(lambda: zml.load(StringIO(s), **kw), repeat=3)
+        base = base or t
+        print(f'{name:>30}: {t * 1e3:8.1f} ms ({base / t:.1f}x)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
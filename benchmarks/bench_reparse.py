@@ -0,0 +1,35 @@
+"""Keystroke-sized edits: ZmlDocument.edit() versus parsing the whole text."""
+import random
+import sys
+import time
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+
+
+def main(sections: int = 20000, edits: int = 1000) -> None:
+    s = make_document(sections)
+    print(f'document: {len(s) / 1e6:.1f} MB')
+    base = best_of(lambda: zml.loads(s), repeat=1)
+    print(f'{"full parse":>12}: {base * 1e3:9.3f} ms')
+    doc = zml.ZmlDocument(s)
+    # retype the port of random sections, one digit at a time
+    rnd = random.Random(0)
+    times = []
+    for _ in range(edits + 1):
+        text = doc.text
+        pos = text.find(f'<section_{rnd.randrange(sections)}>')
+        pos = text.find('<port>', pos) + len('<port> ')
+        t = time.perf_counter()
+        doc.edit(pos, pos + 1, str(rnd.randrange(1, 10)))
+        times.append(time.perf_counter() - t)
+    print(f'{"first edit":>12}: {times[0] * 1e3:9.3f} ms '
+          '(builds the top-level span table)')
+    times = sorted(times[1:])
+    print(f'{"edit":>12}: {times[len(times) // 2] * 1e3:9.3f} ms median, '
+          f'{times[-len(times) // 100] * 1e3:.3f} ms p99')
+    assert doc.tree == zml.loads(doc.text)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
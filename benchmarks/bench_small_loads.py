@@ -0,0 +1,39 @@
+"""Throughput of loads() on many small documents.
+
+Compares a reused ZmlDecoder with the old per-call ``deepcopy`` of the
+module level PLY lexer.
+"""
+import sys
+from copy import deepcopy
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+from zen_markup_lang import lexer as zml_lexer
+
+
+def main(count: int = 2000) -> None:
+    blob = make_document(2)
+    blobs = [blob] * count
+    print(f'{count} documents of {len(blob)} bytes')
+
+    def old_ply():
+        for s in blobs:
+            lx = zml_lexer.Lexer()
+            lx._lexer = deepcopy(zml_lexer.lexer)
+            reader = zml.zml.ZmlReader()
+            reader._lexer = lx
+            reader.input(s)
+            reader.read()
+
+    cases = [('ply + deepcopy', old_ply)]
+    for engine in ('ply', 'scanner'):
+        decoder = zml.ZmlDecoder(engine)
+        cases.append((f'{engine} decoder',
+                      lambda d=decoder: [d.decode(s) for s in blobs]))
+    for name, fn in cases:
+        t = best_of(fn, repeat=3)
+        print(f'{name:>16}: {count / t:9.0f} docs/s')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,49 @@
+"""Peak memory of loading a large file whole versus streamed in chunks."""
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from common import make_document
+import zen_markup_lang as zml
+
+
+def peak(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(sections: int = 20000) -> None:
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'big.zml')
+        with open(path, 'w') as f:
+            f.write(make_document(sections))
+        size = os.path.getsize(path)
+        print(f'document: {size / 1e6:.1f} MB')
+
+        def whole():
+            with open(path) as f:
+                zml.loads(f.read())
+
+        def streamed():
+            with open(path) as f:
+                zml.load(f)
+
+        def fed():
+            parser = zml.ZmlFeedParser()
+            with open(path) as f:
+                for chunk in iter(lambda: f.read(4096), ''):
+                    parser.feed(chunk)
+            parser.close()
+
+        for name, fn in (('read() + loads', whole), ('load (chunked)', streamed),
+                         ('ZmlFeedParser', fed)):
+            print(f'{name:>15}: peak {peak(fn) / 1e6:7.1f} MB')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
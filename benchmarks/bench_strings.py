@@ -0,0 +1,39 @@
+"""Load time of documents holding one very long string literal.
+
+The old per-character t_STR alternation is only timed on the smaller sizes,
+larger inputs exhaust memory in the regex engine.
+"""
+import re
+import sys
+
+from common import best_of
+import zen_markup_lang as zml
+
+_OLD_STR = re.compile(r'"([^\\\n"]|\\\\|\\"|\\n|\\b|\\t)*"')
+_OLD_LIMIT = 1 << 20
+
+
+def make_string(size: int, escapes: bool) -> str:
+    unit = 'abcdefg\\n' if escapes else 'abcdefghi'
+    return '"' + unit * (size // len(unit)) + '"'
+
+
+def main(*sizes: int) -> None:
+    sizes = sizes or (1 << 10, 1 << 20, 50 << 20)
+    for size in sizes:
+        for escapes in (False, True):
+            lit = make_string(size, escapes)
+            doc = f'<s> {lit} </s>\n'
+            label = f'{size:>9} B {"escaped" if escapes else "plain":>7}'
+            repeat = 5 if size <= _OLD_LIMIT else 1
+            for engine in ('ply', 'scanner'):
+                t = best_of(lambda: zml.loads(doc, engine), repeat)
+                print(f'{label} {engine:>8}: {size / t / 1e6:8.1f} MB/s')
+            if size <= _OLD_LIMIT:
+                t = best_of(lambda: _OLD_STR.match(lit), repeat)
+                print(f'{label} {"old re":>8}: {size / t / 1e6:8.1f} MB/s'
+                      ' (match only)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
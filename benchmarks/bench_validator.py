@@ -0,0 +1,109 @@
+"""Validated load against load followed by a separate validation pass.
+
+The schema is a dict of dataclasses.  The separate pass is timed twice:
+with a generic validator that interprets the type hints while it walks
+the tree, as hand-rolled deploy checks usually do, and with the closures
+of compile_validator().
+"""
+import dataclasses
+import sys
+import typing
+from typing import Any, Dict, List, Optional, Union
+
+from common import best_of, make_document
+import zen_markup_lang as zml
+
+
+@dataclasses.dataclass
+class Limits:
+    cpu: int
+    memory: int
+    ratio: float
+
+
+@dataclasses.dataclass
+class Section:
+    name: str
+    enabled: bool
+    port: int
+    timeout: float
+    owner: Optional[str]
+    hosts: List[str]
+    limits: Limits
+    tags: List[Any] = dataclasses.field(default_factory=list)
+
+
+Config = Dict[str, Section]
+
+
+def walk(t, value, path=(), errors=None):
+    """List the errors of ``value``, interpreting ``t`` at every node."""
+    if errors is None:
+        errors = []
+    if dataclasses.is_dataclass(t):
+        if not isinstance(value, dict):
+            errors.append((path, 'expected an object'))
+            return errors
+        for f in dataclasses.fields(t):
+            hint = typing.get_type_hints(t)[f.name]
+            if f.name in value:
+                walk(hint, value[f.name], path + (f.name,), errors)
+            elif (f.default is dataclasses.MISSING
+                  and f.default_factory is dataclasses.MISSING):
+                errors.append((path, f'missing member {f.name}'))
+        return errors
+    origin = typing.get_origin(t)
+    if origin is list:
+        if not isinstance(value, list):
+            errors.append((path, 'expected an array'))
+        else:
+            for i, v in enumerate(value):
+                walk(t.__args__[0], v, path + (i,), errors)
+    elif origin is dict:
+        if not isinstance(value, dict):
+            errors.append((path, 'expected an object'))
+        else:
+            for k, v in value.items():
+                walk(t.__args__[1], v, path + (k,), errors)
+    elif origin is Union:
+        if not any(not walk(a, value, path, []) for a in t.__args__):
+            errors.append((path, f'expected {t}'))
+    elif t is float:
+        if type(value) not in (int, float):
+            errors.append((path, 'expected a float'))
+    elif t is not Any and type(value) is not (type(None) if t is None else t):
+        errors.append((path, f'expected {t}'))
+    return errors
+
+
+def main(sections: int = 5000) -> None:
+    s = make_document(sections)
+    print(f'{sections} sections, {len(s) / 1e6:.1f} MB')
+    validator = zml.compile_validator(Config)
+    tree = zml.loads(s)
+    assert walk(Config, tree) == validator.errors(tree) == []
+    assert validator.loads(s) == tree
+    # a wrong type in the first section: the parse stops there
+    bad = s.replace('<enabled> false', '<enabled> 0', 1)
+    cases = [
+        ('loads', lambda: zml.loads(s)),
+        ('loads + generic walk', lambda: walk(Config, zml.loads(s))),
+        ('loads + errors()', lambda: validator.errors(zml.loads(s))),
+        ('errors() alone', lambda: validator.errors(tree)),
+        ('validated loads', lambda: validator.loads(s)),
+        ('bad: loads + errors()', lambda: validator.errors(zml.loads(bad))),
+    ]
+    for name, fn in cases:
+        print(f'{name:>24}: {best_of(fn, repeat=5) * 1000:7.1f} ms')
+
+    def fail():
+        try:
+            validator.loads(bad)
+        except zml.ZmlDecodeError as e:
+            return e
+    t = best_of(fail, repeat=5)
+    print(f'{"bad: validated loads":>24}: {t * 1000:7.1f} ms, {fail()}')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,45 @@
+"""Helpers shared by the benchmark scripts.
+
+Run any benchmark from the repository root, e.g.::
+
+    PYTHONPATH=src python benchmarks/bench_lexer.py
+"""
+import random
+import time
+from typing import Callable
+
+import zen_markup_lang as zml
+
+
+def make_config(sections: int, seed: int = 0) -> dict:
+    """Build a config-like object with ``sections`` top-level sections."""
+    rnd = random.Random(seed)
+    d = {}
+    for i in range(sections):
+        d[f'section_{i}'] = {
+            'name': f'service-{i}',
+            'enabled': rnd.random() < 0.5,
+            'port': rnd.randrange(1024, 65536),
+            'timeout': round(rnd.uniform(0, 30), 3),
+            'owner': None,
+            'hosts': [f'host-{i}-{j}.example.com' for j in range(4)],
+            'limits': {'cpu': rnd.randrange(1, 64),
+                       'memory': rnd.randrange(1, 1 << 20),
+                       'ratio': rnd.randrange(1, 10 ** 6) / 1000},
+            'tags': [],
+        }
+    return d
+
+
+def make_document(sections: int, seed: int = 0) -> str:
+    return zml.dumps(make_config(sections, seed))
+
+
+def best_of(fn: Callable[[], object], repeat: int = 5) -> float:
+    """Return the best wall time of ``repeat`` calls to ``fn``."""
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
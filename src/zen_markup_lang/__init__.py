@@ -1 +1,32 @@
-from .zml import dump, dumps, load, loads
+from ._version import __version__
+from .zml import dump, dumps, load, load_path, loads, ZmlDecoder, ZmlFeedParser
+from .errors import ZmlDecodeError, ZmlSchemaError
+from .events import iterparse
+from .incremental import ZmlDocument, reparse
+
+# Names of submodules that import heavy parts of the standard library
+# (multiprocessing, asyncio, hashlib, ctypes, dataclasses...), loaded the first time one
+# of them is used so that importing the package stays fast.
+_LAZY = {
+    'dump_many': 'batch', 'load_many': 'batch', 'load_parallel': 'batch',
+    'loads_parallel': 'batch',
+    'adump': 'aio', 'aload': 'aio',
+    'ZmlCache': 'cache', 'load_cached': 'cache',
+    'ConfigStore': 'store',
+    'compile_loader': 'schema', 'compile_validator': 'schema',
+    'is_valid': 'check', 'validate': 'check',
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    from importlib import import_module
+    value = globals()[name] = getattr(import_module(f'.{module}', __name__),
+                                      name)
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
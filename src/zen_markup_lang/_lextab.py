@@ -0,0 +1,7 @@
+# Generated by `python -m zen_markup_lang.lexer`, do not edit.
+lextokens = ['BOOL', 'EMPTY_ARR', 'EMPTY_OBJ', 'END_TAG', 'FLOAT', 'INT', 'NULL', 'START_TAG', 'STR']
+lexreflags = 64
+lexre = '(?P<t_STR>"[^\\\\\\n"]*(?:\\\\[\\\\"nbtr][^\\\\\\n"]*)*"|`[^\\n`]*`)|(?P<t_FLOAT>(0_*|[1-9][_0-9]*)\\._*[0-9][_0-9]*)|(?P<t_END_TAG></([_a-zA-Z][_a-zA-Z0-9]*)?>)|(?P<t_START_TAG><([_a-zA-Z][_a-zA-Z0-9]*)?>)|(?P<t_INT>0_*|[1-9][_0-9]*)|(?P<t_BOOL>true|false)|(?P<t_ignore_COMMENT>\\#[^\\n]*\\n)|(?P<t_EMPTY_ARR>empty_arr)|(?P<t_EMPTY_OBJ>empty_obj)|(?P<t_NULL>null)'
+lexindexfunc = [None, (None, 'STR'), (None, 'FLOAT'), None, (None, 'END_TAG'), None, (None, 'START_TAG'), None, (None, 'INT'), (None, 'BOOL'), (None, None), (None, 'EMPTY_ARR'), (None, 'EMPTY_OBJ'), (None, 'NULL')]
+lexignore = ' \t\r\n'
+lexerrorf = 't_error'
@@ -0,0 +1,104 @@
+import asyncio
+import codecs
+from concurrent.futures import Executor
+from functools import partial
+from typing import Iterable, Optional, Union
+from .projection import compile_projection
+from .scanner import DEFAULT_CHUNK_SIZE
+from .zml import Object, ZmlFeedParser, _dump, dumps, loads
+
+# the default number of tokens parsed, or of characters serialized, between
+# two returns to the event loop
+DEFAULT_YIELD_EVERY = 4096
+
+
+async def aload(reader: asyncio.StreamReader, *,
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                yield_every: int = DEFAULT_YIELD_EVERY,
+                in_executor: Union[bool, Executor] = False,
+                encoding: str = 'utf-8',
+                include: Optional[Iterable[str]] = None,
+                exclude: Optional[Iterable[str]] = None,
+                **options) -> Object:
+    """Read and parse a ZML document from an asyncio stream.
+
+    By default the document is parsed on the event loop as it arrives:
+    chunks of at most ``chunk_size`` bytes are fed to a
+    :class:`~zen_markup_lang.zml.ZmlFeedParser`, and control goes back to
+    the loop after every ``yield_every`` tokens and after every chunk, so
+    the loop is never blocked for long, even when the data is already
+    buffered or the document is a single line.
+
+    With ``in_executor`` the whole stream is read first and then parsed in
+    the loop's default executor (True) or in the given executor, which
+    leaves the loop alone for the whole parse; with a thread pool the parse
+    still competes with the loop for the GIL.
+
+    ``include``, ``exclude`` and the other options are as for
+    :func:`~zen_markup_lang.zml.load`, except ``engine`` and ``lazy``.
+    ``reader`` may also be any object with an async ``read(n)`` returning
+    ``str`` or ``bytes``.
+    """
+    if in_executor is not False:
+        data = await reader.read()
+        if isinstance(data, str):
+            data = data.encode(encoding)
+        elif encoding != 'utf-8':
+            data = data.decode(encoding).encode()
+        executor = None if in_executor is True else in_executor
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, partial(loads, data, 'bytes', include=include,
+                              exclude=exclude, **options))
+    parser = ZmlFeedParser(projection=compile_projection(include, exclude),
+                           **options)
+    decoder = codecs.getincrementaldecoder(encoding)()
+    while True:
+        data = await reader.read(chunk_size)
+        if not data:
+            break
+        more = parser.feed(
+            decoder.decode(data) if isinstance(data, bytes) else data,
+            yield_every)
+        await asyncio.sleep(0)
+        while more:
+            more = parser.resume(yield_every)
+            await asyncio.sleep(0)
+    # parsed with the last line, in steps below
+    parser.feed(decoder.decode(b'', final=True), 0)
+    parser.feed_eof()
+    while parser.resume(yield_every):
+        await asyncio.sleep(0)
+    return parser.close()
+
+
+async def adump(d: Object, writer: asyncio.StreamWriter, *,
+                yield_every: int = DEFAULT_YIELD_EVERY,
+                in_executor: Union[bool, Executor] = False,
+                encoding: str = 'utf-8') -> None:
+    """Serialize ``d`` to an asyncio stream.
+
+    The text is written about every ``yield_every`` characters, with the
+    writer drained and control given back to the loop each time, also
+    within a large container.  With ``in_executor`` the whole document is
+    serialized in an executor instead, see :func:`aload`.
+    """
+    if in_executor is not False:
+        executor = None if in_executor is True else in_executor
+        s = await asyncio.get_running_loop().run_in_executor(
+            executor, dumps, d)
+        writer.write(s.encode(encoding))
+        await writer.drain()
+        return
+    pieces = []
+    size = 0
+    for piece in _dump(d, 0):
+        pieces.append(piece)
+        size += len(piece)
+        if size >= yield_every:
+            writer.write(''.join(pieces).encode(encoding))
+            pieces = []
+            size = 0
+            await writer.drain()
+            await asyncio.sleep(0)
+    writer.write(''.join(pieces).encode(encoding))
+    await writer.drain()
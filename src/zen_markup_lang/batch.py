@@ -0,0 +1,230 @@
+import os
+import re
+from concurrent.futures import (Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor, as_completed)
+from itertools import repeat
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+from .projection import compile_projection
+from .zml import (IReadable, Object, ZmlReader, _finisher, _Pairs, dump,
+                  load, loads)
+
+# (path, decoded document or None, exception or None)
+LoadResult = Tuple[str, Optional[Object], Optional[Exception]]
+# (path, exception or None)
+DumpResult = Tuple[str, Optional[Exception]]
+
+_EXECUTORS = {'process': ProcessPoolExecutor, 'thread': ThreadPoolExecutor}
+
+
+def _load_chunk(paths: List[str], encoding: str, options: dict) -> List[LoadResult]:
+    ret = []
+    for path in paths:
+        try:
+            with open(path, encoding=encoding) as fp:
+                ret.append((path, load(fp, **options), None))
+        except Exception as e:
+            ret.append((path, None, e))
+    return ret
+
+
+def _dump_chunk(items: List[Tuple[str, Object]], encoding: str) -> List[DumpResult]:
+    ret = []
+    for path, obj in items:
+        try:
+            with open(path, 'w', encoding=encoding) as fp:
+                dump(obj, fp)
+            ret.append((path, None))
+        except Exception as e:
+            ret.append((path, e))
+    return ret
+
+
+def _run(fn, items: list, args: tuple, workers: Optional[int],
+         executor: Union[str, Executor], ordered: bool,
+         chunksize: Optional[int]) -> Iterator[Any]:
+    """Run ``fn(chunk, *args)`` over chunks of ``items`` and flatten the results."""
+    if not isinstance(executor, Executor) and executor not in _EXECUTORS:
+        raise ValueError(f'unknown executor {executor!r}')
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunksize is None:
+        # a few chunks per worker balances the load without sending one
+        # task, and pickling one result, per file
+        chunksize = max(1, len(items) // (workers * 4))
+    chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+    return _results(fn, chunks, args, workers, executor, ordered)
+
+
+def _results(fn, chunks: list, args: tuple, workers: int,
+             executor: Union[str, Executor], ordered: bool) -> Iterator[Any]:
+    owned = not isinstance(executor, Executor)
+    pool = _EXECUTORS[executor](workers) if owned else executor
+    futures = []
+    try:
+        futures = [pool.submit(fn, chunk, *args) for chunk in chunks]
+        for future in futures if ordered else as_completed(futures):
+            yield from future.result()
+    finally:
+        # nothing is left to wait for unless the caller stopped early
+        for future in futures:
+            future.cancel()
+        if owned:
+            pool.shutdown()
+
+
+def load_many(paths: Iterable[str], workers: Optional[int] = None,
+              executor: Union[str, Executor] = 'process', ordered: bool = True,
+              chunksize: Optional[int] = None, encoding: str = 'utf-8',
+              **options) -> Iterator[LoadResult]:
+    """Load many ZML files in parallel.
+
+    Parameters
+    ----------
+    paths : iterable of str
+        The files to load.
+    workers : int, optional
+        The number of worker processes or threads, ``os.cpu_count()`` if
+        None.  Ignored when ``executor`` is an executor instance.
+    executor : {'process', 'thread'} or Executor
+        Where to run the workers.  Processes are the ones that scale with
+        the number of cores; the options and results must then be
+        picklable, e.g. no lambdas as hooks.
+    ordered : bool
+        If true, yield the results in the order of ``paths``, else as soon
+        as they are ready.
+    chunksize : int, optional
+        The number of files per task.  Each task is one round trip to a
+        worker, so larger chunks cut the pickling overhead.  By default the
+        files are split into about four chunks per worker.
+    encoding : str
+        The encoding of the files.
+    **options
+        Passed to :func:`~zen_markup_lang.zml.load`.
+
+    Returns
+    -------
+    iterator of (str, Object, Exception)
+        ``(path, document, None)`` for every file that loaded and
+        ``(path, None, error)`` for every file that failed.
+
+    """
+    return _run(_load_chunk, list(paths), (encoding, options), workers,
+                executor, ordered, chunksize)
+
+
+def dump_many(items: Iterable[Tuple[str, Object]], workers: Optional[int] = None,
+              executor: Union[str, Executor] = 'process', ordered: bool = True,
+              chunksize: Optional[int] = None,
+              encoding: str = 'utf-8') -> Iterator[DumpResult]:
+    """Write many ``(path, document)`` pairs in parallel.
+
+    Yields ``(path, None)`` or ``(path, error)`` per file, see
+    :func:`load_many` for the other parameters.
+    """
+    return _run(_dump_chunk, list(items), (encoding,), workers, executor,
+                ordered, chunksize)
+
+
+# A start tag, after any whitespace and comments.
+_start_tag = re.compile(r'''
+    [ \t\r\n]*(?:\#[^\n]*\n[ \t\r\n]*)*
+    <([_a-zA-Z][_a-zA-Z0-9]*)>''', re.VERBOSE).match
+
+MIN_PART_SIZE = 1 << 20
+
+
+def _split(text: str, parts: int) -> List[str]:
+    """Cut ``text`` into up to ``parts`` pieces between top-level elements.
+
+    The top level is walked by jumping from each start tag to its end tag
+    with ``str.find``, so the contents are not scanned in Python.  An end
+    tag inside a string or comment leads to a wrong cut, but every piece is
+    parsed as a document of its own and a wrong cut always leaves an
+    unclosed element, string or comment behind, so it cannot go unnoticed.
+    """
+    bounds = [0]
+    pos = 0
+    while len(bounds) < parts:
+        m = _start_tag(text, pos)
+        if m is None:
+            break
+        start = m.start(1) - 1
+        if pos and start >= len(text) * len(bounds) // parts:
+            bounds.append(start)
+        start_tag = m.group()[start - m.start():]
+        end_tag = '</' + start_tag[1:]
+        # elements with the same tag may be nested
+        depth = 1
+        pos = m.end()
+        while depth:
+            end = text.find(end_tag, pos)
+            if end == -1:
+                return _pieces(text, bounds)
+            depth += text.count(start_tag, pos, end) - 1
+            pos = end + len(end_tag)
+    return _pieces(text, bounds)
+
+
+def _pieces(text: str, bounds: List[int]) -> List[str]:
+    bounds.append(len(text))
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def _load_members(text: str, options: dict) -> Object:
+    reader = ZmlReader(**options)
+    reader.input(text)
+    return reader._read_members()
+
+
+def loads_parallel(s: str, workers: Optional[int] = None,
+                   executor: Union[str, Executor] = 'process',
+                   min_part_size: int = MIN_PART_SIZE, *,
+                   include: Optional[Iterable[str]] = None,
+                   exclude: Optional[Iterable[str]] = None,
+                   **options) -> Object:
+    """Parse one large document on several cores.
+
+    The document is cut between top-level elements into one part per
+    worker, but no part smaller than ``min_part_size`` characters; the
+    parts are parsed in parallel and their members merged in document
+    order.  Smaller documents, and documents whose top level cannot be
+    split, are parsed by :func:`~zen_markup_lang.zml.loads` directly, as
+    are documents with an error, so that the error is reported for the
+    document as a whole.
+
+    ``workers`` and ``executor`` are as for :func:`load_many`; ``include``,
+    ``exclude`` and the other options are as for
+    :func:`~zen_markup_lang.zml.loads`, except ``lazy``.
+    """
+    if not isinstance(executor, Executor) and executor not in _EXECUTORS:
+        raise ValueError(f'unknown executor {executor!r}')
+    if workers is None:
+        workers = os.cpu_count() or 1
+    parts = _split(s, min(workers, len(s) // max(min_part_size, 1)))
+    if len(parts) < 2:
+        return loads(s, include=include, exclude=exclude, **options)
+    finish = _finisher(None, options.get('object_hook'),
+                       options.get('object_pairs_hook'))
+    options['projection'] = compile_projection(include, exclude)
+    owned = not isinstance(executor, Executor)
+    pool = _EXECUTORS[executor](len(parts)) if owned else executor
+    # the pairs of every part go to the hook, duplicate keys included
+    root = {} if options.get('object_pairs_hook') is None else _Pairs()
+    try:
+        for members in pool.map(_load_members, parts, repeat(options)):
+            root.update(members)
+    except RuntimeError:
+        del options['projection']
+        return loads(s, include=include, exclude=exclude, **options)
+    finally:
+        if owned:
+            pool.shutdown()
+    return root if finish is None else finish(root)
+
+
+def load_parallel(fp: IReadable, workers: Optional[int] = None,
+                  executor: Union[str, Executor] = 'process',
+                  min_part_size: int = MIN_PART_SIZE, **options) -> Object:
+    """Read the document in ``fp`` and parse it with :func:`loads_parallel`."""
+    return loads_parallel(fp.read(), workers, executor, min_part_size,
+                          **options)
@@ -0,0 +1,124 @@
+import re
+from typing import Callable, Optional, Tuple, Union
+from .errors import ZmlDecodeError
+from .lexer import Lexer, token_start, unescape
+from .scanner import _MATCH, _SKIP, _STRUCTURE
+
+T = Lexer.Token
+
+# The patterns of the str scanner, compiled for bytes.  They only use ASCII
+# and no byte of a multi-byte UTF-8 sequence is ASCII, so they match UTF-8
+# text exactly like the str patterns match the decoded text.
+_match = re.compile(_MATCH.encode(), re.VERBOSE).match
+skip = re.compile(_SKIP.encode()).match
+structure = re.compile(_STRUCTURE.encode(), re.VERBOSE).finditer
+# the body and closing quote of a string with escapes
+_escaped = re.compile(rb'([^\\\n"]*(?:\\[\\"nbtr][^\\\n"]*)*)"').match
+
+
+def _decode(b: bytes) -> str:
+    return b.decode()
+
+
+# group name -> (token kind, converter applied to the group bytes)
+_ACTIONS = {
+    'STR': (T.STRING, _decode),
+    'RAW': (T.STRING, _decode),
+    'FLOAT': (T.FLOAT, lambda b: float(b.replace(b'_', b''))),
+    'END_TAG': (T.END_TAG, _decode),
+    'START_TAG': (T.START_TAG, _decode),
+    'INT': (T.INT, lambda b: int(b.replace(b'_', b''))),
+    'TRUE': (T.BOOL, lambda _: True),
+    'FALSE': (T.BOOL, lambda _: False),
+    'EMPTY_ARR': (T.EMPTY_ARR, lambda _: []),
+    'EMPTY_OBJ': (T.EMPTY_OBJ, lambda _: {}),
+    'NULL': (T.NULL, lambda _: None),
+}
+
+
+class ByteScanner:
+    """A tokenizer that works on UTF-8 encoded bytes.
+
+    The input can be any buffer the ``re`` module accepts, such as ``bytes``
+    or an ``mmap``, and is never decoded as a whole: only tag names and
+    string values are, one token at a time.  A ``str`` input is encoded
+    first.
+    """
+
+    def __init__(self) -> None:
+        self._actions = _ACTIONS
+        self.input(b'')
+
+    def set_number_parsers(self, parse_int: Optional[Callable] = None,
+                           parse_float: Optional[Callable] = None) -> None:
+        """See :meth:`Lexer.set_number_parsers`."""
+        actions = dict(_ACTIONS)
+        if parse_int is not None:
+            actions['INT'] = (
+                T.INT, lambda b: parse_int(b.replace(b'_', b'').decode()))
+        if parse_float is not None:
+            actions['FLOAT'] = (
+                T.FLOAT, lambda b: parse_float(b.replace(b'_', b'').decode()))
+        self._actions = actions
+
+    def input(self, s) -> None:
+        if isinstance(s, str):
+            s = s.encode()
+        self._text = s
+        self._pos = 0
+        self._end = len(s)
+
+    def input_stream(self, readable) -> None:
+        # a binary stream, or a text stream whose text is encoded
+        self.input(readable.read())
+
+    def error(self, msg: str, at_end: bool = False) -> ZmlDecodeError:
+        """See :meth:`Lexer.error`, the position is a byte offset."""
+        pos = self._pos
+        return ZmlDecodeError(
+            msg, self._text, pos if at_end else token_start(self._text, pos))
+
+    def _error(self) -> None:
+        pos = skip(self._text, self._pos, self._end).end()
+        char = bytes(self._text[pos:pos + 4]).decode(errors='replace')[:1]
+        raise ZmlDecodeError(f'illegal character {char}', self._text, pos)
+
+    def skip_element(self, name: str) -> None:
+        """See :meth:`Scanner.skip_element`."""
+        names = [name.encode()]
+        for m in structure(self._text, self._pos, self._end):
+            group = m.lastgroup
+            if group == 'TAG':
+                if not m.group('CLOSE'):
+                    names.append(m.group('TAG'))
+                elif names.pop() != m.group('TAG'):
+                    self._pos = m.start()
+                    raise ZmlDecodeError('unexpected end tag', self._text,
+                                         self._pos)
+                elif not names:
+                    self._pos = m.end()
+                    return
+            elif group == 'BAD':
+                self._pos = m.start()
+                self._error()
+        self._pos = self._end
+        raise self.error('unexpected end of input', True)
+
+    def get_token(self) -> Tuple[Union[str, bool, None, int, float], Lexer.Token]:
+        m = _match(self._text, self._pos, self._end)
+        if m is None:
+            self._error()
+        name = m.lastgroup
+        if name == 'EOF':
+            self._pos = m.end()
+            return (None, T.EOF)
+        if name == 'QUOTE':
+            m2 = _escaped(self._text, m.end(), self._end)
+            value = None if m2 is None else unescape(m2.group(1).decode())
+            if value is None:
+                self._error()
+            self._pos = m2.end()
+            return (value, T.STRING)
+        self._pos = m.end()
+        kind, convert = self._actions[name]
+        return (convert(m.group(name)), kind)
@@ -0,0 +1,154 @@
+import hashlib
+import marshal
+import os
+import threading
+from collections import OrderedDict
+from copy import deepcopy
+from types import MappingProxyType
+from typing import Any, Optional, Union
+from .zml import _CUSTOM_TYPES, Object, load_path, loads
+
+POLICIES = ('copy', 'frozen', 'shared')
+
+
+def _freeze(value: Any) -> Any:
+    """Return a read-only copy: dicts become mapping proxies, lists tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class _Entry:
+    __slots__ = ('signature', 'digest', 'size', 'value', 'blob')
+
+    def __init__(self, signature: tuple, digest: Optional[bytes], size: int,
+                 value: Any, blob: Optional[bytes]):
+        self.signature = signature
+        self.digest = digest
+        self.size = size
+        self.value = value
+        self.blob = blob
+
+
+class ZmlCache:
+    """A cache of parsed ZML files with LRU eviction.
+
+    A cached document is reused as long as the file's stat signature
+    (mtime, size and inode) is unchanged.  With ``verify_hash`` the file is
+    read and hashed on every lookup instead and the document is reused as
+    long as the content is the same, which also catches changes within the
+    mtime resolution; parsing is still avoided.
+
+    ``policy`` decides what a lookup returns:
+
+    * ``'copy'`` (the default): a fresh deep copy, which the caller may
+      modify.  Plain documents are stored marshalled, so a copy costs one
+      ``marshal.loads``.
+    * ``'frozen'``: the same read-only view every time, with mapping
+      proxies for objects and tuples for arrays.
+    * ``'shared'``: the same object every time, which must not be modified.
+
+    At most ``max_entries`` documents are kept, and the files they were
+    parsed from total at most ``max_bytes`` (no limit if None); the least
+    recently used documents are evicted first.  The other options are
+    passed to :func:`~zen_markup_lang.zml.load_path`.  :attr:`hits` and
+    :attr:`misses` count the lookups.  The cache can be shared by threads.
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: Optional[int] = None,
+                 verify_hash: bool = False, policy: str = 'copy', **options):
+        if policy not in POLICIES:
+            raise ValueError(f'unknown policy {policy!r}')
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.verify_hash = verify_hash
+        self.policy = policy
+        self._options = options
+        # Without these options a document only holds the types marshal
+        # round-trips exactly.  It would turn an array.array into bytes.
+        self._marshal = all(options.get(k) is None for k in _CUSTOM_TYPES)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def invalidate(self, path: Union[str, os.PathLike]) -> None:
+        """Forget the document of ``path``, if cached."""
+        with self._lock:
+            self._pop(os.path.realpath(path))
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _result(self, entry: _Entry) -> Any:
+        if entry.blob is not None:
+            return marshal.loads(entry.blob)
+        if self.policy == 'copy':
+            return deepcopy(entry.value)
+        return entry.value
+
+    def load(self, path: Union[str, os.PathLike]) -> Object:
+        """Return the document in the file at ``path``, parsed at most once per version."""
+        key = os.path.realpath(path)
+        st = os.stat(key)
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        data = digest = None
+        if self.verify_hash:
+            with open(key, 'rb') as f:
+                data = f.read()
+            digest = hashlib.blake2b(data).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.digest == digest if self.verify_hash
+                                      else entry.signature == signature):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._result(entry)
+            self.misses += 1
+        if data is None:
+            value = load_path(key, **self._options)
+        else:
+            value = loads(data, 'bytes', **self._options)
+        blob = None
+        if self.policy == 'frozen':
+            value = _freeze(value)
+        elif self.policy == 'copy' and self._marshal:
+            blob = marshal.dumps(value)
+        entry = _Entry(signature, digest, st.st_size,
+                       None if blob is not None else value, blob)
+        with self._lock:
+            self._pop(key)
+            if self.max_bytes is None or entry.size <= self.max_bytes:
+                self._entries[key] = entry
+                self._bytes += entry.size
+                while len(self._entries) > self.max_entries or (
+                        self.max_bytes is not None
+                        and self._bytes > self.max_bytes):
+                    _, old = self._entries.popitem(last=False)
+                    self._bytes -= old.size
+        if blob is None and self.policy == 'copy':
+            # the parsed value itself is cached, hand out a copy
+            return deepcopy(value)
+        return value
+
+
+_default_cache = ZmlCache()
+
+
+def load_cached(path: Union[str, os.PathLike],
+                cache: Optional[ZmlCache] = None) -> Object:
+    """Load ``path`` through ``cache``, a shared default cache if None."""
+    return (_default_cache if cache is None else cache).load(path)
@@ -0,0 +1,116 @@
+"""Checking that a document is well formed without decoding it.
+
+A regex matches whole runs of scalar elements, e.g. all the ``<> "host" </>``
+items of an array, with the tokens of their values checked but not
+converted.  The Python loop only sees those runs and the tags of
+containers, and keeps the tag balance and object/array checks of
+:meth:`ZmlReader._parse`, so no value, dict or list is ever built.
+
+The fast pass only says yes to well-formed documents.  Anything it does not
+accept is parsed again by :func:`~zen_markup_lang.zml.loads`, so errors are
+reported exactly as by a load, with their position and path.
+"""
+import re
+from typing import Union
+from .errors import ZmlDecodeError
+from .lexer import _SPACE
+from .zml import IReadable, loads
+
+_TAG = r'[_a-zA-Z][_a-zA-Z0-9]*'
+
+# The tokens of a scalar value, as the scanner splits them: a value must be
+# followed by an end tag, so a token the scanner would end earlier (e.g.
+# "truex" or "01") does not match.
+_STRING = r'''(?:"[^\\\n"]*(?:\\[\\"nbtr][^\\\n"]*)*"|`[^\n`]*`)'''
+_VALUE = (r'''(?:
+        {string}(?:{space}{string})*
+      | (?:0_*|[1-9][_0-9]*)(?:\._*[0-9][_0-9]*)?
+      | true | false | null | empty_arr | empty_obj
+    ){space}''').format(string=_STRING, space=_SPACE)
+
+_CHECK = (r'''{space}(?:
+        (?P<NAMED>(?:<(?P<NAME>{tag})>{space}{value}</(?P=NAME)>{space})+)
+      | (?P<ANONYMOUS>(?:<>{space}{value}</>{space})+)
+      | <(?P<START_TAG>(?:{tag})?)>
+      | </(?P<END_TAG>(?:{tag})?)>
+      | (?P<EOF>\Z)
+    )''').format(space=_SPACE, tag=_TAG, value=_VALUE)
+_check = re.compile(_CHECK, re.VERBOSE).finditer
+
+
+def _well_formed(s: str) -> bool:
+    """Whether ``s`` is a well-formed document, False when unsure."""
+    # the tags of the open containers, the top-level object first
+    stack = [None]
+    # whether the members of the innermost container are named
+    named = True
+    # the tag whose value is being read, None between elements
+    key = None
+    pos = 0
+    for i, m in enumerate(_check(s)):
+        if m.start() != pos:
+            return False
+        pos = m.end()
+        group = m.lastgroup
+        if group == 'END_TAG':
+            if key is not None or len(stack) == 1:
+                return False
+            tag = m.group('END_TAG')
+            if stack.pop() != tag:
+                return False
+            # the container is a member of its parent
+            named = tag != ''
+            continue
+        if group == 'EOF':
+            return key is None and len(stack) == 1 and i > 0
+        tag = m.group('START_TAG')
+        is_named = group == 'NAMED' or bool(tag)
+        if key is not None:
+            # the first member of a new container
+            stack.append(key)
+            named = is_named
+            key = None
+        elif is_named is not named:
+            return False
+        if tag is not None:
+            key = tag
+    return False
+
+
+def is_valid(s: Union[str, bytes]) -> bool:
+    """Return whether ``s`` is a well-formed ZML document.
+
+    Much faster than :func:`~zen_markup_lang.zml.loads` since no value is
+    decoded.  ``s`` may be UTF-8 bytes.
+    """
+    try:
+        _validate(s)
+    except (ZmlDecodeError, UnicodeDecodeError):
+        return False
+    return True
+
+
+def _validate(s: Union[str, bytes]) -> None:
+    """Raise the error that :func:`loads` would raise for ``s``, if any."""
+    if isinstance(s, str):
+        if _well_formed(s):
+            return
+        engine = 'scanner'
+    else:
+        try:
+            if _well_formed(bytes(s).decode()):
+                return
+        except UnicodeDecodeError:
+            pass
+        engine = 'bytes'
+    loads(s, engine)
+
+
+def validate(fp: IReadable) -> None:
+    """Check that the document in a text or binary stream is well formed.
+
+    No values are decoded unless the document is invalid: it is then
+    loaded to raise the :class:`~zen_markup_lang.errors.ZmlDecodeError`
+    of its first error, as :func:`~zen_markup_lang.zml.load` would.
+    """
+    _validate(fp.read())
@@ -0,0 +1,78 @@
+"""A persistent cache of parsed documents, in the spirit of ``__pycache__``.
+
+A cache file holds the marshalled tree of one source file together with the
+key it was parsed under: the package version, the Python implementation
+(the marshal format may change between versions), the load options and a
+hash of the source content.  A cache file is only used when its whole key
+matches, so editing the source, upgrading either package or changing the
+options simply makes it stale; it is overwritten by the next load.  A cache
+file that cannot be read or unmarshalled, e.g. a truncated one, is treated
+like a stale one.  Cache files are written to a temporary file first and
+then renamed over the old one, so readers never see a partial file, and a
+cache that cannot be written is silently not used.
+"""
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+from typing import Any, Optional, Tuple, Union
+from ._version import __version__
+
+CACHE_DIR = '__zmlcache__'
+SUFFIX = '.zmlc'
+_MAGIC = b'ZMLC'
+
+
+def cache_path(source: str, cache_dir: Optional[str] = None) -> str:
+    """Return the cache file of ``source``.
+
+    It is ``__zmlcache__/<name>.zmlc`` next to the source, or a name unique
+    to the source's real path inside ``cache_dir``.
+    """
+    source = os.path.realpath(source)
+    head, name = os.path.split(source)
+    if cache_dir is None:
+        return os.path.join(head, CACHE_DIR, name + SUFFIX)
+    tag = hashlib.blake2b(os.fsencode(source), digest_size=8).hexdigest()
+    return os.path.join(cache_dir, f'{name}-{tag}{SUFFIX}')
+
+
+def make_key(content, options: dict) -> Tuple:
+    """Return the key of the tree parsed from ``content`` with ``options``."""
+    return (__version__, sys.implementation.cache_tag,
+            repr(sorted(options.items())),
+            hashlib.blake2b(content).digest())
+
+
+def read(path: str, key: Tuple) -> Any:
+    """Return the cached tree if it was stored under ``key``, else None."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:len(_MAGIC)] != _MAGIC:
+            return None
+        stored_key, tree = marshal.loads(data[len(_MAGIC):])
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return tree if stored_key == key else None
+
+
+def write(path: Union[str, os.PathLike], key: Tuple, tree: Any) -> None:
+    """Store ``tree`` under ``key``, atomically; errors are ignored."""
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_MAGIC)
+            marshal.dump((key, tree), f)
+        os.replace(tmp, path)
+    except (OSError, ValueError):
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
@@ -0,0 +1,88 @@
+import re
+from typing import List, Optional, Tuple, Union
+
+# the path of an element: member tags, and indices for array items
+Path = Tuple[Union[str, int], ...]
+
+_newline = re.compile('\n').findall
+_bnewline = re.compile(b'\n').findall
+
+
+class ZmlDecodeError(RuntimeError):
+    """A ZML document could not be decoded.
+
+    ``pos`` is the offset of the error in ``doc``, counted in bytes when
+    the document was given as bytes.  ``lineno`` and ``colno`` (both
+    starting at 1, the column counted in characters) are computed from them
+    the first time they are read, so parses that succeed never count lines.
+    When the document was read from a stream there is no ``doc`` and the
+    position is computed when the error is raised.
+
+    ``path`` holds the tags of the elements that were open at the error, and
+    the index of each array item on the way, e.g. ``('servers', 2, 'port')``.
+
+    It is a :class:`RuntimeError` for compatibility with older versions.
+    """
+
+    def __init__(self, msg: str, doc=None, pos: int = 0,
+                 lineno: Optional[int] = None, colno: Optional[int] = None,
+                 path: Path = ()):
+        super().__init__(msg)
+        self.msg = msg
+        self.doc = doc
+        self.pos = pos
+        self._lineno = lineno
+        self._colno = colno
+        self.path = path
+
+    @property
+    def lineno(self) -> int:
+        if self._lineno is None:
+            doc = self.doc
+            count = _newline if isinstance(doc, str) else _bnewline
+            self._lineno = len(count(doc, 0, self.pos)) + 1
+        return self._lineno
+
+    @property
+    def colno(self) -> int:
+        if self._colno is None:
+            doc = self.doc
+            if isinstance(doc, str):
+                self._colno = self.pos - doc.rfind('\n', 0, self.pos)
+            else:
+                start = doc.rfind(b'\n', 0, self.pos) + 1
+                line = bytes(doc[start:self.pos]).decode(errors='replace')
+                self._colno = len(line) + 1
+        return self._colno
+
+    def _detach(self) -> None:
+        """Compute the position now and drop ``doc``, about to go away."""
+        self.lineno, self.colno
+        self.doc = None
+
+    def __str__(self) -> str:
+        where = f'{self.msg} in line {self.lineno} column {self.colno}'
+        if self.path:
+            where += f' at {".".join(map(str, self.path))}'
+        return where
+
+    def __reduce__(self):
+        # the document can be large and an mmap cannot be pickled at all
+        return (self.__class__, (self.msg, None, self.pos, self.lineno,
+                                 self.colno, self.path))
+
+
+class ZmlSchemaError(ValueError):
+    """A decoded document does not match a schema.
+
+    ``errors`` lists every mismatch as ``(path, message)``, the path as in
+    :class:`ZmlDecodeError`.
+    """
+
+    def __init__(self, errors: List[Tuple[Path, str]]):
+        super().__init__(errors)
+        self.errors = errors
+
+    def __str__(self) -> str:
+        return '; '.join(f'{msg} at {".".join(map(str, path))}' if path
+                         else msg for path, msg in self.errors)
@@ -0,0 +1,165 @@
+from typing import Any, Iterator, Optional, Tuple, Union
+from .errors import Path, ZmlDecodeError
+from .lexer import Lexer
+from .zml import ENGINES, IReadable
+
+START_OBJECT = 'start_object'
+START_ARRAY = 'start_array'
+SCALAR = 'scalar'
+END = 'end'
+
+# (event, key, value, depth)
+Event = Tuple[str, Union[str, int], Any, int]
+
+_NOTHING = object()
+
+
+class ZmlEventReader:
+    """Iterate over a ZML document as a stream of parse events.
+
+    Every event is a tuple ``(event, key, value, depth)``.  ``event`` is one
+    of :data:`START_OBJECT`, :data:`START_ARRAY`, :data:`SCALAR` and
+    :data:`END`; ``key`` is the tag of the element, or its index inside an
+    array; ``value`` is the decoded value of a scalar and None otherwise;
+    ``depth`` is 1 for the members of the top-level object and grows by one
+    per enclosing container.  The top-level object itself produces no events.
+
+    Only the stack of open containers is kept, so memory does not grow with
+    the size of the document.  Stop iterating at any time to end early, or
+    call :meth:`read_value` after a start event to build that subtree.
+    """
+
+    def __init__(self, readable: IReadable, engine: str = 'scanner'):
+        if engine not in ENGINES:
+            raise ValueError(f'unknown engine {engine!r}')
+        self._lexer = ENGINES[engine]()
+        self._lexer.input_stream(readable)
+        self._events = self._generate()
+        self._last = None
+
+    def __iter__(self) -> Iterator[Event]:
+        return self
+
+    def __next__(self) -> Event:
+        self._last = next(self._events)
+        return self._last
+
+    def read_value(self) -> Any:
+        """Return the value of the element whose start event was just read.
+
+        The events of the subtree, up to and including its end event, are
+        consumed.  After a scalar event the scalar is returned.
+        """
+        if self._last is None:
+            raise RuntimeError('no event has been read')
+        event, _, value, _ = self._last
+        if event == SCALAR:
+            return value
+        if event == END:
+            raise RuntimeError('read_value() called after an end event')
+        root = {} if event == START_OBJECT else []
+        stack = [root]
+        for event, key, value, _ in self._events:
+            if event == END:
+                stack.pop()
+                if not stack:
+                    self._last = (event, key, value, _)
+                    return root
+                continue
+            if event == START_OBJECT:
+                value = {}
+            elif event == START_ARRAY:
+                value = []
+            container = stack[-1]
+            if container.__class__ is dict:
+                container[key] = value
+            else:
+                container.append(value)
+            if event != SCALAR:
+                stack.append(value)
+        raise RuntimeError('unexpected end of input')
+
+    def _generate(self) -> Iterator[Event]:
+        T = Lexer.Token
+        get_token = self._lexer.get_token
+        error = self._lexer.error
+        # [is_object, closing tag, event key, index of the next array item]
+        stack = [[True, None, None, 0]]
+        key = None
+        value = _NOTHING
+        empty = True
+        try:
+            while True:
+                content, kind = get_token()
+                if kind is T.START_TAG:
+                    empty = False
+                    frame = stack[-1]
+                    if key is None:
+                        if (content == '') is frame[0]:
+                            raise error('anonymous member in an object'
+                                        if not content else
+                                        'named member in an array')
+                        key = content
+                        continue
+                    if value is not _NOTHING:
+                        raise error('unexpected start tag after a value')
+                    if frame[0]:
+                        name = key
+                    else:
+                        name = frame[3]
+                        frame[3] += 1
+                    stack.append([content != '', key, name, 0])
+                    yield (START_OBJECT if content else START_ARRAY, name,
+                           None, len(stack) - 1)
+                    key = content
+                elif kind is T.END_TAG:
+                    frame = stack[-1]
+                    if key is None:
+                        if len(stack) == 1 or frame[1] != content:
+                            raise error('unexpected end tag')
+                        stack.pop()
+                        yield (END, frame[2], None, len(stack))
+                        continue
+                    if content != key:
+                        raise error('unexpected end tag')
+                    if value is _NOTHING:
+                        raise error('missing value')
+                    if frame[0]:
+                        name = key
+                    else:
+                        name = frame[3]
+                        frame[3] += 1
+                    yield (SCALAR, name, value, len(stack))
+                    key = None
+                    value = _NOTHING
+                elif kind is T.EOF:
+                    if key is not None or len(stack) != 1:
+                        raise error('unexpected end of input', True)
+                    if empty:
+                        raise error('empty document', True)
+                    return
+                else:
+                    if key is None:
+                        raise error('value outside of an element')
+                    if value is _NOTHING:
+                        value = content
+                    elif kind is T.STRING and value.__class__ is str:
+                        value += content
+                    else:
+                        raise error('unexpected value after a value')
+        except ZmlDecodeError as e:
+            e.path = _error_path(stack, key)
+            raise
+
+
+def _error_path(stack: list, key: Optional[str]) -> Path:
+    """Return the path of the element being read from the event state."""
+    path = [frame[2] for frame in stack[1:]]
+    if key is not None:
+        path.append(key if key else stack[-1][3])
+    return tuple(path)
+
+
+def iterparse(fp: IReadable, engine: str = 'scanner') -> ZmlEventReader:
+    """Return a :class:`ZmlEventReader` over the document in ``fp``."""
+    return ZmlEventReader(fp, engine)
@@ -0,0 +1,232 @@
+from typing import Any, List, Optional, Tuple
+from .errors import ZmlDecodeError
+from .lazy import _children
+from .zml import _NOTHING, loads, ZmlReader
+
+# (start, end, replacement): text[start:end] is replaced
+Edit = Tuple[int, int, str]
+
+# pieces before the text is joined into one string again
+_MAX_PIECES = 64
+
+
+class _Pieces:
+    """A piece table: the text as a list of ``(string, start, end)`` slices.
+
+    Replacing a range costs a few slices instead of a copy of the whole
+    text; the pieces are joined again once there are too many of them.
+    """
+
+    def __init__(self, text: str):
+        self._pieces = [(text, 0, len(text))]
+        self._len = len(text)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def slice(self, start: int, end: int) -> str:
+        ret = []
+        pos = 0
+        for s, a, b in self._pieces:
+            n = b - a
+            if pos + n > start and pos < end:
+                ret.append(s[a + max(start - pos, 0):a + min(end - pos, n)])
+            pos += n
+            if pos >= end:
+                break
+        return ''.join(ret)
+
+    def text(self) -> str:
+        pieces = self._pieces
+        if len(pieces) == 1 and pieces[0][1] == 0 and (
+                pieces[0][2] == len(pieces[0][0])):
+            return pieces[0][0]
+        text = ''.join(s[a:b] for s, a, b in pieces)
+        self._pieces = [(text, 0, len(text))]
+        return text
+
+    def _split(self, pos: int) -> int:
+        """Make ``pos`` a piece boundary, return the index of the piece there."""
+        offset = 0
+        for i, (s, a, b) in enumerate(self._pieces):
+            if offset == pos:
+                return i
+            if offset + b - a > pos:
+                k = a + pos - offset
+                self._pieces[i:i + 1] = [(s, a, k), (s, k, b)]
+                return i + 1
+            offset += b - a
+        return len(self._pieces)
+
+    def replace(self, start: int, end: int, new: str) -> None:
+        i = self._split(start)
+        j = self._split(end)
+        self._pieces[i:j] = [(new, 0, len(new))] if new else []
+        self._len += len(new) - (end - start)
+        if len(self._pieces) > _MAX_PIECES:
+            self.text()
+
+
+class _Shifts:
+    """A Fenwick tree of the length changes of the children of a container."""
+
+    def __init__(self, n: int):
+        self._tree = [0] * (n + 1)
+
+    def add(self, i: int, delta: int) -> None:
+        """Record that child ``i`` grew by ``delta``."""
+        tree = self._tree
+        i += 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def before(self, j: int) -> int:
+        """The total change of the children before child ``j``."""
+        tree = self._tree
+        ret = 0
+        while j > 0:
+            ret += tree[j]
+            j -= j & -j
+        return ret
+
+
+class _Node:
+    """The span table of a container: where its direct children are.
+
+    Offsets are relative to the start of the container's value, so that
+    edits outside the container do not invalidate them, and are corrected by
+    the changes recorded in :attr:`shifts` since the table was built.  The
+    tables of child containers are built on demand.
+    """
+
+    __slots__ = ('tags', 'starts', 'vstarts', 'vends', 'shifts', 'nodes',
+                 'unique')
+
+    def __init__(self, value: str):
+        spans = _children(value, 0, len(value))
+        self.tags = [tag for tag, _, _ in spans]
+        self.starts = [vstart - len(tag) - 2 for tag, vstart, _ in spans]
+        self.vstarts = [vstart for _, vstart, _ in spans]
+        self.vends = [vend for _, _, vend in spans]
+        self.shifts = _Shifts(len(spans))
+        self.nodes: List[Optional[_Node]] = [None] * len(spans)
+        # a member can only be replaced in the tree if its tag is unique
+        self.unique = not spans or not self.tags[0] or (
+            len(set(self.tags)) == len(self.tags))
+
+    def value_span(self, j: int) -> Tuple[int, int]:
+        return (self.vstarts[j] + self.shifts.before(j),
+                self.vends[j] + self.shifts.before(j + 1))
+
+    def find(self, start: int, end: int) -> Optional[int]:
+        """Return the child whose value contains ``[start, end]``, if any."""
+        lo, hi = 0, len(self.starts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.starts[mid] + self.shifts.before(mid) <= start:
+                lo = mid + 1
+            else:
+                hi = mid
+        j = lo - 1
+        if j < 0:
+            return None
+        vstart, vend = self.value_span(j)
+        return j if vstart <= start and end <= vend else None
+
+
+def _parse_value(text: str) -> Any:
+    """Parse ``text``, the value of an element without its tags.
+
+    The reader starts inside an element whose tag is not an identifier, so
+    no end tag in ``text`` can close it.  Raises :class:`ZmlDecodeError`
+    unless ``text`` is exactly one value.
+    """
+    reader = ZmlReader()
+    reader._key = '!'
+    reader.input(text)
+    reader._parse()
+    stack = reader._stack
+    if reader._key == '!' and len(stack) == 1:
+        if reader._value is not _NOTHING:
+            return reader._value
+    elif reader._key is None and len(stack) == 2 and stack[1][1] == '!':
+        return stack[1][0]
+    raise ZmlDecodeError('not a single value')
+
+
+class ZmlDocument:
+    """A parsed document that is updated incrementally as its text is edited.
+
+    :meth:`edit` replaces a range of the text and only parses again the
+    innermost element whose value contains the edit, splicing the result
+    into :attr:`tree`; containers on the way keep their span tables, which
+    are built the first time an edit reaches them.  Edits that touch tags of
+    the top level, or that leave the element invalid on its own, fall back
+    to parsing the whole text.  An edit that makes the document invalid
+    raises and leaves the document unchanged.
+    """
+
+    def __init__(self, text: str):
+        self.tree = loads(text)
+        self._text = _Pieces(text)
+        self._root = None
+
+    @property
+    def text(self) -> str:
+        return self._text.text()
+
+    def edit(self, start: int, end: int, new: str) -> None:
+        """Replace ``text[start:end]`` with ``new`` and update :attr:`tree`."""
+        if not 0 <= start <= end <= len(self._text):
+            raise ValueError('edit out of range')
+        if self._root is None:
+            self._root = _Node(self._text.text())
+        # descend to the innermost element whose value contains the edit
+        path = []
+        node, base, container = self._root, 0, self.tree
+        while node.unique:
+            j = node.find(start - base, end - base)
+            if j is None:
+                break
+            key = node.tags[j] or j
+            path.append((node, j, container, key, base))
+            value = container[key]
+            if not (isinstance(value, (dict, list)) and value):
+                break
+            vstart, vend = node.value_span(j)
+            if node.nodes[j] is None:
+                node.nodes[j] = _Node(
+                    self._text.slice(base + vstart, base + vend))
+            node, base, container = node.nodes[j], base + vstart, value
+        if path:
+            node, j, container, key, base = path[-1]
+            vstart, vend = node.value_span(j)
+            vstart += base
+            vend += base
+            text = ''.join((self._text.slice(vstart, start), new,
+                            self._text.slice(end, vend)))
+            try:
+                value = _parse_value(text)
+            except RuntimeError:
+                pass
+            else:
+                container[key] = value
+                delta = len(new) - (end - start)
+                for n, jj, _, _, _ in path:
+                    n.shifts.add(jj, delta)
+                node.nodes[j] = None
+                self._text.replace(start, end, new)
+                return
+        text = self._text.text()
+        text = text[:start] + new + text[end:]
+        self.tree = loads(text)
+        self._text = _Pieces(text)
+        self._root = None
+
+
+def reparse(doc: ZmlDocument, edit: Edit) -> ZmlDocument:
+    """Apply ``edit``, a ``(start, end, replacement)`` triple, to ``doc``."""
+    doc.edit(*edit)
+    return doc
+
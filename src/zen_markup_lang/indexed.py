@@ -0,0 +1,126 @@
+import re
+from typing import Callable, Optional, Tuple, Union
+from .errors import ZmlDecodeError
+from .lexer import _SPACE, _TOKEN, Lexer, _tokens, unescape
+
+T = Lexer.Token
+
+# Stage one: split the whole input into token strings with a single findall()
+# call, so the per-character work stays inside the regex engine.  Anything
+# that does not start a valid token is returned as a one-character token,
+# which stage two reports as an error.  The whitespace and comments at the
+# end are matched as empty tokens, which are dropped.
+_index = re.compile(_SPACE + '(' + _TOKEN + r'| \Z)', re.VERBOSE).findall
+
+_DIGITS = frozenset('0123456789')
+
+
+class IndexedScanner:
+    """A tokenizer that indexes the whole input before parsing starts.
+
+    Stage one cuts the input into token strings in one pass of the regex
+    engine; stage two, :meth:`get_token`, only has to classify each token by
+    its first character and decode it.  Stage two is still one Python call
+    per token from the same parser loop, so the whole parse runs at about
+    the speed of :class:`~zen_markup_lang.scanner.Scanner`
+    (``benchmarks/bench_engines.py``), while the index holds every token
+    string of the document in memory.
+    """
+
+    def __init__(self) -> None:
+        self.input('')
+        self._parse_int = int
+        self._parse_float = float
+
+    def set_number_parsers(self, parse_int: Optional[Callable] = None,
+                           parse_float: Optional[Callable] = None) -> None:
+        """See :meth:`Lexer.set_number_parsers`."""
+        self._parse_int = parse_int or int
+        self._parse_float = parse_float or float
+
+    def input(self, s: str) -> None:
+        self._text = s
+        tokens = self._tokens = _index(s)
+        while tokens and not tokens[-1]:
+            tokens.pop()
+        self._n = len(self._tokens)
+        self._i = 0
+
+    def input_stream(self, readable) -> None:
+        self.input(readable.read())
+
+    def _span(self, i: int) -> Tuple[int, int]:
+        # The index keeps no positions: find token i by scanning the input
+        # again, which only happens on the error path.
+        for k, m in enumerate(_tokens(self._text)):
+            if k == i:
+                return m.span(1)
+        return (len(self._text), len(self._text))
+
+    def error(self, msg: str, at_end: bool = False) -> ZmlDecodeError:
+        """See :meth:`Lexer.error`."""
+        if at_end and self._i == self._n:
+            pos = len(self._text)
+        elif self._i == 0:
+            pos = 0
+        else:
+            pos = self._span(self._i - 1)[1 if at_end else 0]
+        return ZmlDecodeError(msg, self._text, pos)
+
+    def _error(self) -> None:
+        pos = self._span(self._i)[0]
+        raise ZmlDecodeError(f'illegal character {self._text[pos]}',
+                             self._text, pos)
+
+    def skip_element(self, name: str) -> None:
+        names = [name]
+        tokens = self._tokens
+        while names:
+            if self._i == self._n:
+                raise self.error('unexpected end of input', True)
+            tok = tokens[self._i]
+            self._i += 1
+            if tok[0] == '<':
+                if tok[-1] != '>':
+                    self._error()
+                if tok[1] != '/':
+                    names.append(tok[1:-1])
+                elif names.pop() != tok[2:-1]:
+                    raise self.error('unexpected end tag')
+
+    def get_token(self) -> Tuple[Union[str, bool, None, int, float], Lexer.Token]:
+        i = self._i
+        if i == self._n:
+            return (None, T.EOF)
+        tok = self._tokens[i]
+        self._i = i + 1
+        c = tok[0]
+        if c == '<':
+            if len(tok) > 1:
+                if tok[1] == '/':
+                    return (tok[2:-1], T.END_TAG)
+                return (tok[1:-1], T.START_TAG)
+        elif c == '"':
+            if len(tok) > 1:
+                value = unescape(tok[1:-1])
+                if value is not None:
+                    return (value, T.STRING)
+        elif c in _DIGITS:
+            if '.' in tok:
+                return (self._parse_float(tok.replace('_', '')), T.FLOAT)
+            return (self._parse_int(tok.replace('_', '')), T.INT)
+        elif c == '`':
+            if len(tok) > 1:
+                return (tok[1:-1], T.STRING)
+        elif tok == 'true':
+            return (True, T.BOOL)
+        elif tok == 'false':
+            return (False, T.BOOL)
+        elif tok == 'null':
+            return (None, T.NULL)
+        elif tok == 'empty_arr':
+            return ([], T.EMPTY_ARR)
+        elif tok == 'empty_obj':
+            return ({}, T.EMPTY_OBJ)
+        self._i = i
+        self._error()
@@ -0,0 +1,172 @@
+from collections.abc import Mapping, Sequence
+from typing import Any, Iterator, List, Tuple
+from .errors import ZmlDecodeError
+from .lexer import Lexer
+from .scanner import Scanner, skip, structure
+
+# (tag, start of the value, end of the value) of a direct child
+Span = Tuple[str, int, int]
+
+_NOTHING = object()
+
+
+def _check_gap(text: str, start: int, end: int) -> None:
+    """Check that only whitespace and comments are between two elements."""
+    pos = skip(text, start, end).end()
+    if pos != end:
+        raise ZmlDecodeError('value outside of an element', text, pos)
+
+
+def _children(text: str, start: int, end: int) -> List[Span]:
+    """Locate the direct children of the container in ``text[start:end]``.
+
+    Only tags are looked at (strings and comments are stepped over), so the
+    values themselves are neither tokenized nor decoded.
+    """
+    ret = []
+    names = []
+    pos = start
+    for m in structure(text, start, end):
+        group = m.lastgroup
+        if group is None:
+            continue
+        if group == 'LEAF':
+            if names:
+                continue
+            _check_gap(text, pos, m.start())
+            name = m.group('LEAF')
+            pos = m.end()
+            ret.append((name, m.end('LEAF') + 1, pos - len(name) - 3))
+        elif group == 'TAG':
+            name = m.group('TAG')
+            if not m.group('CLOSE'):
+                if not names:
+                    _check_gap(text, pos, m.start())
+                    value_start = m.end()
+                names.append(name)
+            else:
+                if not names or names.pop() != name:
+                    raise ZmlDecodeError('unexpected end tag', text,
+                                         m.start())
+                if not names:
+                    pos = m.end()
+                    ret.append((name, value_start, m.start()))
+        else:
+            raise ZmlDecodeError(f'illegal character {m.group(group)}',
+                                 text, m.start())
+    if names:
+        raise ZmlDecodeError('unexpected end of input', text, end)
+    _check_gap(text, pos, end)
+    return ret
+
+
+def _value(text: str, start: int, end: int) -> Any:
+    """Decode the value in ``text[start:end]``, lazily if it is a container."""
+    T = Lexer.Token
+    scanner = Scanner()
+    scanner.input(text, start, end)
+    value, kind = scanner.get_token()
+    if kind is T.START_TAG:
+        if value:
+            return LazyObject(text, start, end)
+        return LazyArray(text, start, end)
+    if kind is T.END_TAG or kind is T.EOF:
+        raise scanner.error('missing value', kind is T.EOF)
+    while True:
+        content, kind2 = scanner.get_token()
+        if kind2 is T.EOF:
+            return value
+        if kind2 is T.START_TAG:
+            raise scanner.error('unexpected start tag after a value')
+        if kind2 is not T.STRING or kind is not T.STRING:
+            raise scanner.error('unexpected value after a value')
+        value += content
+
+
+class LazyObject(Mapping):
+    """A read-only view of a ZML object that is decoded on demand.
+
+    Creating it only locates the tags of the direct children.  A member is
+    decoded the first time it is looked up, nested containers becoming
+    further lazy views, and the result is cached.  Errors inside a value are
+    therefore only raised when that value is accessed.
+    """
+
+    def __init__(self, text: str, start: int = 0, end: int = None):
+        if end is None:
+            end = len(text)
+        self._text = text
+        self._spans = {}
+        for name, vstart, vend in _children(text, start, end):
+            if not name:
+                raise ZmlDecodeError('anonymous member in an object', text,
+                                     vstart - 2)
+            self._spans[name] = (vstart, vend)
+        if not self._spans:
+            raise ZmlDecodeError('empty document', text, end)
+        self._cache = {}
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._cache.get(key, _NOTHING)
+        if value is _NOTHING:
+            value = self._cache[key] = _value(self._text, *self._spans[key])
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._spans)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __repr__(self) -> str:
+        return f'<LazyObject with {len(self)} members>'
+
+    def materialize(self) -> dict:
+        """Decode the whole subtree into plain dicts and lists."""
+        return {k: _materialize(v) for k, v in self.items()}
+
+
+class LazyArray(Sequence):
+    """A read-only view of a ZML array that is decoded on demand.
+
+    See :class:`LazyObject`.
+    """
+
+    def __init__(self, text: str, start: int, end: int):
+        self._text = text
+        self._spans = []
+        for name, vstart, vend in _children(text, start, end):
+            if name:
+                raise ZmlDecodeError('named member in an array', text,
+                                     vstart - len(name) - 2)
+            self._spans.append((vstart, vend))
+        self._cache = [_NOTHING] * len(self._spans)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        value = self._cache[index]
+        if value is _NOTHING:
+            value = self._cache[index] = _value(self._text, *self._spans[index])
+        return value
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f'<LazyArray with {len(self)} items>'
+
+    def materialize(self) -> list:
+        """Decode the whole subtree into plain dicts and lists."""
+        return [_materialize(v) for v in self]
+
+
+def _materialize(value: Any) -> Any:
+    if isinstance(value, (LazyObject, LazyArray)):
+        return value.materialize()
+    return value
@@ -1,7 +1,9 @@
-from copy import deepcopy
+import os
+import re
+import sys
 from enum import Enum
-from typing import Tuple, Union
-from .ply import lex
+from typing import Callable, Optional, Tuple, Union
+from .errors import ZmlDecodeError
 
 # List of token names.   This is always required
 tokens = (
@@ -14,7 +16,6 @@ tokens = (
     'NULL',
     'EMPTY_ARR',
     'EMPTY_OBJ',
-    'COMMENT',
 )
 
 # Regular expression rules for simple tokens
@@ -22,75 +23,211 @@ t_START_TAG = r'<([_a-zA-Z][_a-zA-Z0-9]*)?>'
 t_END_TAG = r'</([_a-zA-Z][_a-zA-Z0-9]*)?>'
 t_INT = r'0_*|[1-9][_0-9]*'
 t_FLOAT = r'(0_*|[1-9][_0-9]*)\._*[0-9][_0-9]*'
-t_STR = r'"([^\\\n"]|\\\\|\\"|\\n|\\b|\\t)*"|`[^\n`]*`'
+# Written as "normal* (escape normal*)*" so that runs of plain characters are
+# matched by a single character-class loop instead of one alternation per
+# character, which backtracks heavily on long strings.
+t_STR = r'"[^\\\n"]*(?:\\[\\"nbtr][^\\\n"]*)*"|`[^\n`]*`'
 t_BOOL = 'true|false'
 t_NULL = 'null'
 t_EMPTY_ARR = 'empty_arr'
 t_EMPTY_OBJ = 'empty_obj'
 
 
-def t_COMMENT(t):
-    r'\#[^\n]*\n'
-    t.lexer.lineno += 1
+# Comments and whitespace are dropped without calling a rule function.  No
+# line numbers are counted: the position of an error is computed from its
+# offset when it is needed.
+t_ignore_COMMENT = r'\#[^\n]*\n'
+t_ignore = ' \t\r\n'
 
-# A regular expression rule with some action code
+# Error handling rule
 
 
-# def t_NUMBER(t):
-#     r'\d+'
-#     t.value = int(t.value)
-#     return t
+def t_error(t):
+    raise ZmlDecodeError(f'illegal character {t.value[0]}', t.lexer.lexdata,
+                         t.lexpos)
 
-# Define a rule so we can track line numbers
 
+# The PLY lexer is built from the frozen tables in _lextab.py, which skips
+# the reflection and validation done by lex.lex() (and importing ply.lex at
+# all until the PLY engine is actually used).  Set ZML_LEXER_DEBUG=1 to build
+# it from the rules above instead; that also checks the tables are current.
+# Regenerate them with ``python -m zen_markup_lang.lexer`` after editing a
+# rule.
+_lexer = None
 
-def t_newline(t):
-    r'\n+'
-    t.lexer.lineno += len(t.value)
 
+def _lextab_source(lexobj) -> str:
+    """Render the tables of a lexer built by ``lex.lex()`` as Python source."""
+    (lexre, findex), = lexobj.lexre
+    findex = [f and (f[0] and f[0].__name__, f[1]) for f in findex]
+    return (
+        '# Generated by `python -m zen_markup_lang.lexer`, do not edit.\n'
+        f'lextokens = {sorted(lexobj.lextokens)!r}\n'
+        f'lexreflags = {lexobj.lexreflags!r}\n'
+        f'lexre = {lexre.pattern!r}\n'
+        f'lexindexfunc = {findex!r}\n'
+        f'lexignore = {lexobj.lexignore!r}\n'
+        f'lexerrorf = {lexobj.lexerrorf.__name__!r}\n'
+    )
 
-# A string containing ignored characters (spaces and tabs)
-t_ignore = ' \t\r'
 
-# Error handling rule
+def _build_lexer():
+    from .ply import lex
+    if os.environ.get('ZML_LEXER_DEBUG'):
+        lexobj = lex.lex(module=_rules())
+        with open(_lextab_path()) as f:
+            if f.read() != _lextab_source(lexobj):
+                raise RuntimeError(
+                    '_lextab.py is out of date, run '
+                    '`python -m zen_markup_lang.lexer`')
+        return lexobj
 
+    from . import _lextab as tab
+    g = globals()
+    lexre = [(re.compile(tab.lexre, tab.lexreflags),
+              [f and (f[0] and g[f[0]], f[1]) for f in tab.lexindexfunc])]
+    lexobj = lex.Lexer()
+    lexobj.lextokens = set(tab.lextokens)
+    lexobj.lextokens_all = lexobj.lextokens
+    lexobj.lexreflags = tab.lexreflags
+    lexobj.lexstateinfo = {'INITIAL': 'inclusive'}
+    lexobj.lexstatere['INITIAL'] = lexobj.lexre = lexre
+    lexobj.lexstateretext['INITIAL'] = lexobj.lexretext = [tab.lexre]
+    lexobj.lexstateignore['INITIAL'] = lexobj.lexignore = tab.lexignore
+    lexobj.lexstateerrorf['INITIAL'] = lexobj.lexerrorf = g[tab.lexerrorf]
+    return lexobj
+
+
+def _rules():
+    return sys.modules[__name__]
+
+
+def _lextab_path() -> str:
+    return os.path.join(os.path.dirname(__file__), '_lextab.py')
 
-def t_error(t):
-    raise RuntimeError(f'illegal character {t.value[0]} in line {t.lineno}')
 
+def get_lexer():
+    """Return the shared PLY lexer, building it on first use."""
+    global _lexer
+    if _lexer is None:
+        _lexer = _build_lexer()
+    return _lexer
 
-# Build the lexer
-lexer = lex.lex()
 
+def __getattr__(name):
+    if name == 'lexer':
+        return get_lexer()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
+
+# The escape sequences of double-quoted strings.  zml.to_zml_str() derives
+# its encoding table from this one, so dump and load always agree.
 escaping = {
     't': '\t',
     'n': '\n',
     'b': '\b',
+    'r': '\r',
     '"': '"',
     '\\': '\\',
 }
 
+# Every escape except "\\" as (sequence, character).  unescape() handles
+# "\\" through a placeholder so the order of these replacements is free.
+_unescapes = [('\\' + k, v) for k, v in escaping.items() if k != '\\']
+_bad_escape = re.compile(r'\\(?![%s])' % re.escape(''.join(escaping))).search
+_any_escape = re.compile(r'\\(.)', re.DOTALL)
+
+
+def unescape(s: str) -> Union[str, None]:
+    """Decode the escapes in the body of a double-quoted string.
+
+    The work is done by one ``str.replace`` per escape sequence rather than
+    per character.  Returns None if ``s`` contains an invalid escape.
+    """
+    if '\\' not in s:
+        return s
+    if '\0' in s:
+        # No free placeholder, fall back to one substitution per escape.
+        if _bad_escape(s.replace('\\\\', '')):
+            return None
+        return _any_escape.sub(lambda m: escaping[m.group(1)], s)
+    s = s.replace('\\\\', '\0')
+    if _bad_escape(s):
+        return None
+    for k, v in _unescapes:
+        s = s.replace(k, v)
+    return s.replace('\0', '\\')
+
 
 def string_literal(s: str) -> str:
     if s[0] == '"':
-        builder = []
-        i = 1
-        while True:
-            j = s.find('\\', i)
-            if j == -1:
-                builder.append(s[i:-1])
-                break
-            builder.append(s[i:j])
-            builder.append(escaping[s[j+1]])
-            i = j + 2
-        return ''.join(builder)
+        return unescape(s[1:-1])
     elif s[0] == '`':
         return s[1:-1]
     else:
         raise RuntimeError()
 
 
+def scan_string(s: str, pos: int) -> Tuple[Union[str, None], int]:
+    """Scan a double-quoted string whose opening quote is at ``s[pos - 1]``.
+
+    The closing quote is the first one preceded by an even number of
+    backslashes, so only the quotes are visited on the way; the body is then
+    checked and decoded in bulk.  Returns the decoded string and the position
+    after the closing quote, or ``(None, pos)`` if the string is malformed.
+    """
+    quote = s.find('"', pos)
+    while quote != -1:
+        i = quote - 1
+        while i >= pos and s[i] == '\\':
+            i -= 1
+        if (quote - i) % 2:
+            break
+        quote = s.find('"', quote + 1)
+    else:
+        return None, pos
+    body = s[pos:quote]
+    if '\n' in body:
+        return None, pos
+    body = unescape(body)
+    if body is None:
+        return None, pos
+    return body, quote + 1
+
+
+# Whitespace and comments, then a whole token or a single character that does
+# not start one.  Used by the indexed engine and to find where the token
+# before an error starts.
+_SPACE = r'[ \t\r\n]*(?:\#[^\n]*\n[ \t\r\n]*)*'
+_TOKEN = r'''
+        </?(?:[_a-zA-Z][_a-zA-Z0-9]*)?>
+      | "[^\\\n"]*(?:\\[\\"nbtr][^\\\n"]*)*"
+      | `[^\n`]*`
+      | (?:0_*|[1-9][_0-9]*)(?:\._*[0-9][_0-9]*)?
+      | true | false | null | empty_arr | empty_obj
+      | [^ \t\r\n]'''
+_tokens = re.compile(_SPACE + '(' + _TOKEN + ')', re.VERBOSE).finditer
+_btokens = re.compile((_SPACE + '(' + _TOKEN + ')').encode(),
+                      re.VERBOSE).finditer
+
+
+def token_start(doc, end: int) -> int:
+    """Return the offset of the token that ends at ``end`` in ``doc``.
+
+    No token spans a newline, so the line is tokenized again from its start;
+    this is only done to report an error.  ``doc`` may be bytes.
+    """
+    if isinstance(doc, str):
+        start = doc.rfind('\n', 0, end) + 1
+        tokens = _tokens
+    else:
+        start = doc.rfind(b'\n', 0, end) + 1
+        tokens = _btokens
+    for m in tokens(doc, start, end):
+        start = m.start(1)
+    return start
+
+
 class Lexer:
     class Token(Enum):
         START_TAG = 0
@@ -109,11 +246,53 @@ class Lexer:
                      'BOOL': Token.BOOL, 'NULL': Token.NULL, 'EMPTY_ARR': Token.EMPTY_ARR, 'EMPTY_OBJ': Token.EMPTY_OBJ}
 
     def __init__(self) -> None:
-        self._lexer = deepcopy(lexer)
+        # clone() is a shallow copy: the compiled master regex and the rule
+        # tables are shared, only the input cursor belongs to this instance.
+        self._lexer = get_lexer().clone()
+        self._parse_int = int
+        self._parse_float = float
+
+    def set_number_parsers(self, parse_int: Optional[Callable] = None,
+                           parse_float: Optional[Callable] = None) -> None:
+        """Decode numbers with the given functions instead of int and float.
+
+        They are called with the text of the number, underscores removed.
+        """
+        self._parse_int = parse_int or int
+        self._parse_float = parse_float or float
 
     def input(self, s: str) -> None:
         self._lexer.input(s)
 
+    def input_stream(self, readable) -> None:
+        # PLY needs the whole input up front.
+        self.input(readable.read())
+
+    def error(self, msg: str, at_end: bool = False) -> ZmlDecodeError:
+        """Return an error located at the start of the last token read.
+
+        With ``at_end`` it is located after the last token instead.
+        """
+        doc = self._lexer.lexdata
+        # PLY moves one past the end of the input when it reaches it
+        pos = min(self._lexer.lexpos, len(doc))
+        if not at_end:
+            pos = token_start(doc, pos)
+        return ZmlDecodeError(msg, doc, pos)
+
+    def skip_element(self, name: str) -> None:
+        T = Lexer.Token
+        names = [name]
+        while names:
+            content, kind = self.get_token()
+            if kind is T.START_TAG:
+                names.append(content)
+            elif kind is T.END_TAG:
+                if names.pop() != content:
+                    raise self.error('unexpected end tag')
+            elif kind is T.EOF:
+                raise self.error('unexpected end of input', True)
+
     def get_token(self) -> Tuple[Union[str, bool, None, int, float], Token]:
         tok = self._lexer.token()
         if not tok:
@@ -127,9 +306,9 @@ class Lexer:
         elif kind == T.END_TAG:
             content = content[2:-1]
         elif kind == T.INT:
-            content = int(content.replace('_', ''))
+            content = self._parse_int(content.replace('_', ''))
         elif kind == T.FLOAT:
-            content = float(content.replace('_', ''))
+            content = self._parse_float(content.replace('_', ''))
         elif kind == T.STRING:
             content = string_literal(content)
         elif kind == T.BOOL:
@@ -143,3 +322,9 @@ class Lexer:
         else:
             raise RuntimeError()
         return (content, kind)
+
+
+if __name__ == '__main__':
+    from .ply import lex
+    with open(_lextab_path(), 'w') as f:
+        f.write(_lextab_source(lex.lex(module=_rules())))
@@ -0,0 +1,61 @@
+from typing import Iterable, Optional, Union
+
+
+class Node(dict):
+    """A level of a compiled projection.
+
+    Maps a member tag to the node for its value: another :class:`Node`, None
+    to keep the whole value, or False to skip it.  Tags that are not listed
+    get :attr:`default`.
+    """
+
+    def __init__(self, default: Union[None, bool]):
+        super().__init__()
+        self.default = default
+
+
+def _split(path: str) -> list:
+    keys = path.split('.')
+    if not all(keys):
+        raise ValueError(f'invalid path {path!r}')
+    return keys
+
+
+def compile_projection(include: Optional[Iterable[str]] = None,
+                       exclude: Optional[Iterable[str]] = None) -> Optional[Node]:
+    """Compile dotted ``include`` and ``exclude`` paths into a tree of nodes.
+
+    Returns None, meaning "keep everything", when neither is given.  Paths
+    name object members only; an array is kept or skipped as a whole.
+    """
+    if include is None:
+        root = None
+    else:
+        root = Node(False)
+        for path in include:
+            node = root
+            *parents, last = _split(path)
+            for k in parents:
+                child = node.get(k, False)
+                if child is None:
+                    break
+                if child is False:
+                    child = node[k] = Node(False)
+                node = child
+            else:
+                node[last] = None
+    for path in exclude or ():
+        *parents, last = _split(path)
+        if root is None:
+            root = Node(None)
+        node = root
+        for k in parents:
+            child = node.get(k, node.default)
+            if child is False:
+                break
+            if child is None:
+                child = node[k] = Node(None)
+            node = child
+        else:
+            node[last] = False
+    return root
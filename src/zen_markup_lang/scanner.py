@@ -0,0 +1,268 @@
+import re
+from typing import Callable, Optional, Tuple, Union
+from .errors import ZmlDecodeError
+from .lexer import Lexer, scan_string, token_start
+
+T = Lexer.Token
+
+# One master regex for the whole token set.  The alternatives are tried in
+# the same order as the PLY rules in lexer.py (functions first, then strings
+# sorted by decreasing regex length), so both engines split the input the
+# same way.  Whitespace and comments are consumed in front of every token.
+# Double-quoted strings without escapes are matched in full; any other
+# string only matches its opening quote and is finished by scan_string().
+_MATCH = r'''
+    [ \t\r\n]*(?:\#[^\n]*\n[ \t\r\n]*)*
+    (?:
+        "(?P<STR>[^\\\n"]*)"
+      | (?P<QUOTE>")
+      | `(?P<RAW>[^\n`]*)`
+      | (?P<FLOAT>(?:0_*|[1-9][_0-9]*)\._*[0-9][_0-9]*)
+      | </(?P<END_TAG>(?:[_a-zA-Z][_a-zA-Z0-9]*)?)>
+      | <(?P<START_TAG>(?:[_a-zA-Z][_a-zA-Z0-9]*)?)>
+      | (?P<INT>0_*|[1-9][_0-9]*)
+      | (?P<TRUE>true)
+      | (?P<FALSE>false)
+      | (?P<EMPTY_ARR>empty_arr)
+      | (?P<EMPTY_OBJ>empty_obj)
+      | (?P<NULL>null)
+      | (?P<EOF>\Z)
+    )'''
+_match = re.compile(_MATCH, re.VERBOSE).match
+
+_SKIP = r'[ \t\r\n]*(?:\#[^\n]*\n[ \t\r\n]*)*'
+skip = re.compile(_SKIP).match
+
+
+# Finds the tags of a document without tokenizing the values between them.
+# Strings and comments are matched so that tags inside them are skipped.  An
+# element with a scalar value is matched as a whole (group LEAF holds its
+# tag), any other tag on its own (groups CLOSE and TAG).  BAD is a quote or
+# hash that does not start a well-formed string or comment.
+_STRUCTURE = r'''
+    <(?P<LEAF>(?:[_a-zA-Z][_a-zA-Z0-9]*)?)>
+        [^<"`\#]*(?:(?:"[^\\\n"]*(?:\\.[^\\\n"]*)*"|`[^\n`]*`|\#[^\n]*\n)
+        [^<"`\#]*)*
+    </(?P=LEAF)>
+  | <(?P<CLOSE>/?)(?P<TAG>(?:[_a-zA-Z][_a-zA-Z0-9]*)?)>
+  | "[^\\\n"]*(?:\\.[^\\\n"]*)*"
+  | `[^\n`]*`
+  | \#[^\n]*\n
+  | (?P<BAD>["`\#])
+'''
+structure = re.compile(_STRUCTURE, re.VERBOSE).finditer
+
+
+def _int(s: str) -> int:
+    return int(s.replace('_', ''))
+
+
+def _float(s: str) -> float:
+    return float(s.replace('_', ''))
+
+
+# group name -> (token kind, converter applied to the group text or None)
+_ACTIONS = {
+    'STR': (T.STRING, None),
+    'RAW': (T.STRING, None),
+    'FLOAT': (T.FLOAT, _float),
+    'END_TAG': (T.END_TAG, None),
+    'START_TAG': (T.START_TAG, None),
+    'INT': (T.INT, _int),
+    'TRUE': (T.BOOL, lambda _: True),
+    'FALSE': (T.BOOL, lambda _: False),
+    'EMPTY_ARR': (T.EMPTY_ARR, lambda _: []),
+    'EMPTY_OBJ': (T.EMPTY_OBJ, lambda _: {}),
+    'NULL': (T.NULL, lambda _: None),
+    'EOF': (T.EOF, lambda _: None),
+}
+
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+class Scanner:
+    """A hand-written ZML tokenizer.
+
+    It is a drop-in replacement for :class:`Lexer` that matches each token
+    with a single regex call and decodes the value right away, without going
+    through PLY's ``LexToken`` machinery.
+
+    Besides :meth:`input`, the input can be pulled from a stream in chunks
+    with :meth:`input_stream`, or pushed with :meth:`feed` and :meth:`close`.
+    No token spans a newline (a comment ends with one), so only the text up
+    to the last newline received is tokenized and the rest is kept until
+    more data arrives.  In push mode :meth:`get_token` returns an EOF token
+    when it runs out of data; :attr:`eof` tells whether it is the real end.
+    """
+
+    def __init__(self) -> None:
+        self._text = ''
+        self._pos = 0
+        self._end = 0
+        self._pending = []
+        self._readable = None
+        self._chunk_size = DEFAULT_CHUNK_SIZE
+        self._lines = 0
+        self._offset = 0
+        self._column = 0
+        self._actions = _ACTIONS
+        # the open tags of an element being skipped, while waiting for data
+        self._skipping = None
+        self.eof = True
+
+    def set_number_parsers(self, parse_int: Optional[Callable] = None,
+                           parse_float: Optional[Callable] = None) -> None:
+        """See :meth:`Lexer.set_number_parsers`."""
+        actions = dict(_ACTIONS)
+        if parse_int is not None:
+            actions['INT'] = (T.INT, lambda s: parse_int(s.replace('_', '')))
+        if parse_float is not None:
+            actions['FLOAT'] = (
+                T.FLOAT, lambda s: parse_float(s.replace('_', '')))
+        self._actions = actions
+
+    def input(self, s: str, pos: int = 0, endpos: Optional[int] = None) -> None:
+        """Tokenize ``s``, or only ``s[pos:endpos]`` without copying it."""
+        self._text = s
+        self._pos = pos
+        self._end = len(s) if endpos is None else endpos
+        self._pending = []
+        self._readable = None
+        self._lines = 0
+        self._offset = 0
+        self._column = 0
+        self._skipping = None
+        self.eof = True
+
+    def input_stream(self, readable, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self.input('')
+        self._readable = readable
+        self._chunk_size = chunk_size
+        self.eof = False
+
+    def feed(self, data: str) -> None:
+        self.eof = False
+        self._pending.append(data)
+        if '\n' in data:
+            self._shift()
+            if self._skipping is not None:
+                self._skip()
+
+    def close(self) -> None:
+        self.eof = True
+        self._shift()
+        if self._skipping is not None:
+            self._skip()
+
+    def _shift(self) -> None:
+        """Drop the consumed text and move the pending data in."""
+        text = self._text
+        # where the dropped text ends, to locate errors in what is left
+        pos = self._pos
+        self._lines += text.count('\n', 0, pos)
+        newline = text.rfind('\n', 0, pos)
+        self._column = (pos - newline - 1 if newline >= 0
+                        else self._column + pos)
+        self._offset += pos
+        self._pending.insert(0, text[pos:])
+        text = self._text = ''.join(self._pending)
+        self._pending = []
+        self._pos = 0
+        self._end = len(text) if self.eof else text.rfind('\n') + 1
+
+    def _fill(self) -> bool:
+        """Read chunks until a complete line arrives, False at the end."""
+        if self.eof or self._readable is None:
+            return False
+        while True:
+            chunk = self._readable.read(self._chunk_size)
+            if not chunk:
+                self.eof = True
+                break
+            self._pending.append(chunk)
+            if '\n' in chunk:
+                break
+        self._shift()
+        return True
+
+    def skip_element(self, name: str) -> None:
+        """Skip to after the end tag of the element whose ``<name>`` was just read.
+
+        Only tags are matched on the way, values are neither tokenized nor
+        validated.  In push mode an element that goes on past the data fed so
+        far is skipped further by :meth:`feed` and :meth:`close`, and
+        :meth:`get_token` returns EOF until then.
+        """
+        self._skipping = [name]
+        self._skip()
+
+    def _skip(self) -> None:
+        names = self._skipping
+        while True:
+            for m in structure(self._text, self._pos, self._end):
+                group = m.lastgroup
+                if group == 'TAG':
+                    if not m.group('CLOSE'):
+                        names.append(m.group('TAG'))
+                    elif names.pop() != m.group('TAG'):
+                        self._pos = m.start()
+                        raise self._error_at('unexpected end tag', self._pos)
+                    elif not names:
+                        self._pos = m.end()
+                        self._skipping = None
+                        return
+                elif group == 'BAD':
+                    self._pos = m.start()
+                    self._error()
+            self._pos = self._end
+            if not self._fill():
+                if not self.eof:
+                    # wait for feed()
+                    return
+                self._skipping = None
+                raise self.error('unexpected end of input', True)
+
+    def _error_at(self, msg: str, pos: int) -> ZmlDecodeError:
+        if not self._offset:
+            # the text still starts at the beginning of the document
+            return ZmlDecodeError(msg, self._text, pos)
+        # The start of a streamed document is gone, count from what was
+        # recorded when it was dropped.
+        text = self._text
+        newline = text.rfind('\n', 0, pos)
+        return ZmlDecodeError(
+            msg, None, self._offset + pos,
+            self._lines + text.count('\n', 0, pos) + 1,
+            pos - newline if newline >= 0 else self._column + pos + 1)
+
+    def error(self, msg: str, at_end: bool = False) -> ZmlDecodeError:
+        """See :meth:`Lexer.error`."""
+        pos = self._pos if at_end else token_start(self._text, self._pos)
+        return self._error_at(msg, pos)
+
+    def _error(self) -> None:
+        pos = skip(self._text, self._pos, self._end).end()
+        raise self._error_at(f'illegal character {self._text[pos]}', pos)
+
+    def get_token(self) -> Tuple[Union[str, bool, None, int, float], Lexer.Token]:
+        m = _match(self._text, self._pos, self._end)
+        while m is not None and m.lastgroup == 'EOF':
+            self._pos = m.end()
+            if not self._fill():
+                break
+            m = _match(self._text, self._pos, self._end)
+        if m is None:
+            self._error()
+        name = m.lastgroup
+        if name == 'QUOTE':
+            value, pos = scan_string(self._text, m.end())
+            if value is None:
+                self._error()
+            self._pos = pos
+            return (value, T.STRING)
+        self._pos = m.end()
+        kind, convert = self._actions[name]
+        if convert is None:
+            return (m.group(name), kind)
+        return (convert(m.group(name)), kind)
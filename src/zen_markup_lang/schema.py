@@ -0,0 +1,612 @@
+"""Loaders generated for a schema.
+
+:func:`compile_loader` turns a dataclass, a ``TypedDict`` or a dict of
+types into Python source for a recursive-descent parser of documents of
+that shape, and compiles it.  The parser knows which tags to expect and
+what type each value has, so it reads the tokens straight into the target
+objects: scalars are checked and stored inline, one function per container
+type, and no intermediate dicts are built.
+
+:func:`compile_validator` checks documents against the same schemas,
+either while they are parsed into plain dicts and lists, with the same
+generated parser, or afterwards, with nested closures that are built once
+and walk a decoded tree.
+"""
+import array
+import dataclasses
+import types
+import typing
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from .errors import Path, ZmlDecodeError, ZmlSchemaError
+from .lexer import Lexer
+from .zml import ENGINES
+
+T = Lexer.Token
+
+_MISSING = object()
+
+# scalar type -> the token kinds it accepts, and how to convert each
+_SCALARS = {
+    int: {'INT': ''},
+    float: {'FLOAT': '', 'INT': 'float'},
+    str: {'STRING': ''},
+    bool: {'BOOL': ''},
+    type(None): {'NULL': ''},
+}
+
+_NAMES = {int: 'an int', float: 'a float', str: 'a string', bool: 'a bool',
+          type(None): 'null'}
+
+
+def _describe(t) -> str:
+    """'an int', 'a string or null'... for a scalar type."""
+    return _NAMES.get(t) or ' or '.join(
+        _NAMES.get(a, repr(a)) for a in getattr(t, '__args__', ()))
+
+
+def _expected(error, kind: Lexer.Token, what: str) -> ZmlDecodeError:
+    """The error for a value whose first token is of the wrong ``kind``."""
+    if kind is T.END_TAG:
+        return error('missing value')
+    if kind is T.EOF:
+        return error('unexpected end of input', True)
+    return error(f'expected {what}')
+
+
+def _unexpected(error, kind: Lexer.Token) -> ZmlDecodeError:
+    """The error for a token where the end tag of a value should be."""
+    if kind is T.END_TAG:
+        return error('unexpected end tag')
+    if kind is T.EOF:
+        return error('unexpected end of input', True)
+    if kind is T.START_TAG:
+        return error('unexpected start tag after a value')
+    return error('unexpected value after a value')
+
+
+def _any(get_token, error, content, kind, tag):
+    """Read a value of any type, whose first token was ``(content, kind)``."""
+    if kind is T.START_TAG:
+        value = {} if content else []
+        while kind is T.START_TAG:
+            if (not content) is (value.__class__ is dict):
+                raise error('anonymous member in an object' if not content
+                            else 'named member in an array')
+            item = _any(get_token, error, *get_token(), content)
+            if content:
+                value[content] = item
+            else:
+                value.append(item)
+            content, kind = get_token()
+    elif kind is T.STRING:
+        value = content
+        content, kind = get_token()
+        while kind is T.STRING:
+            value += content
+            content, kind = get_token()
+    elif kind is T.END_TAG or kind is T.EOF:
+        raise _expected(error, kind, 'a value')
+    else:
+        value = content
+        content, kind = get_token()
+    if kind is not T.END_TAG or content != tag:
+        raise _unexpected(error, kind)
+    return value
+
+
+def _origin(t) -> Any:
+    if isinstance(t, getattr(types, 'UnionType', ())):
+        return Union
+    return getattr(t, '__origin__', None)
+
+
+def _is_typed_dict(t) -> bool:
+    return (isinstance(t, type) and issubclass(t, dict)
+            and hasattr(t, '__total__'))
+
+
+def _members(schema) -> Dict[str, tuple]:
+    """Map the tags of an object schema to ``(type, required, default, factory)``.
+
+    ``default`` is _MISSING and ``factory`` None unless the member is a
+    dataclass field with a default or a default factory.
+    """
+    if isinstance(schema, dict):
+        return {k: (t, True, _MISSING, None) for k, t in schema.items()}
+    hints = typing.get_type_hints(schema)
+    if _is_typed_dict(schema):
+        required = getattr(schema, '__required_keys__', None)
+        if required is None:
+            required = set(hints) if schema.__total__ else set()
+        return {k: (t, k in required, _MISSING, None)
+                for k, t in hints.items()}
+    ret = {}
+    for f in dataclasses.fields(schema):
+        if not f.init:
+            continue
+        default = (_MISSING if f.default is dataclasses.MISSING
+                   else f.default)
+        factory = (None if f.default_factory is dataclasses.MISSING
+                   else f.default_factory)
+        ret[f.name] = (hints[f.name], default is _MISSING and factory is None,
+                       default, factory)
+    return ret
+
+
+def _is_object(t) -> bool:
+    return (isinstance(t, dict) or dataclasses.is_dataclass(t)
+            and isinstance(t, type) or _is_typed_dict(t))
+
+
+class _Compiler:
+    """Generates the source of the parser functions of a schema."""
+
+    def __init__(self, plain: bool = False) -> None:
+        # plain: build the dicts and lists that loads() would, only checked
+        self.plain = plain
+        self.namespace = {'_MISSING': _MISSING, '_expected': _expected,
+                          '_unexpected': _unexpected, '_any': _any,
+                          'ZmlDecodeError': ZmlDecodeError}
+        self.functions = []
+        # id of a type -> name of its function
+        self._names = {}
+        # the types are referenced by the namespace, so ids stay unique
+        self._keep = []
+
+    def constant(self, value: Any) -> str:
+        name = f'_c{len(self.namespace)}'
+        self.namespace[name] = value
+        return name
+
+    def _scalars(self, t) -> Optional[Dict[str, str]]:
+        """The token kinds accepted by a scalar type, None if not one."""
+        if isinstance(t, type) and t in _SCALARS:
+            return _SCALARS[t]
+        if _origin(t) is Union:
+            kinds = {}
+            for arg in t.__args__:
+                sub = self._scalars(arg)
+                if sub is None:
+                    return None
+                kinds.update((k, c) for k, c in sub.items() if k not in kinds)
+            return kinds
+        return None
+
+    def _container(self, t) -> str:
+        """Return the name of the function that reads a value of type ``t``."""
+        key = id(t)
+        if key in self._names:
+            return self._names[key]
+        name = self._names[key] = f'_t{len(self._names)}'
+        self._keep.append(t)
+        origin = _origin(t)
+        if t is Any:
+            self.functions.append([
+                f'def {name}(content, kind, tag):',
+                '    return _any(get_token, error, content, kind, tag)'])
+        elif _is_object(t):
+            self.functions.append(self._object(name, t))
+        elif t is list or origin in (list, List):
+            args = getattr(t, '__args__', None) or (Any,)
+            self.functions.append(self._array(name, args[0]))
+        elif t is dict or origin in (dict, Dict):
+            args = getattr(t, '__args__', None) or (str, Any)
+            if args[0] is not str:
+                raise TypeError(f'object keys must be str, not {args[0]!r}')
+            self.functions.append(self._mapping(name, args[1]))
+        else:
+            raise TypeError(f'unsupported type {t!r}')
+        return name
+
+    def value(self, t, target: str, tag: str) -> List[str]:
+        """Lines that read the value of an element into ``target``.
+
+        The start tag has been read, the end tag ``tag`` (an expression) is
+        read as well.
+        """
+        kinds = self._scalars(t)
+        if kinds is not None:
+            return self._scalar(t, kinds, target, tag)
+        optional = False
+        if _origin(t) is Union:
+            args = [a for a in t.__args__ if a is not type(None)]
+            if len(args) != 1:
+                raise TypeError(f'unsupported union {t!r}')
+            optional = True
+            t = args[0]
+        function = self._container(t)
+        lines = ['content, kind = get_token()']
+        if optional:
+            lines += ['if kind is NULL:',
+                      f'    {target} = None',
+                      '    content, kind = get_token()',
+                      f'    if kind is not END_TAG or content != {tag}:',
+                      '        raise _unexpected(error, kind)',
+                      'else:',
+                      f'    {target} = {function}(content, kind, {tag})']
+        else:
+            lines.append(f'{target} = {function}(content, kind, {tag})')
+        return lines
+
+    def _scalar(self, t, kinds: Dict[str, str], target: str,
+                tag: str) -> List[str]:
+        lines = ['content, kind = get_token()']
+        for i, (kind, convert) in enumerate(kinds.items()):
+            lines.append(f'{"el" if i else ""}if kind is {kind}:')
+            lines.append(f'    {target} = {convert}(content)'
+                         if convert and not self.plain
+                         else f'    {target} = content')
+            lines.append('    content, kind = get_token()')
+            if kind == 'STRING':
+                lines += ['    while kind is STRING:',
+                          f'        {target} += content',
+                          '        content, kind = get_token()']
+        lines += ['else:',
+                  f'    raise _expected(error, kind, {_describe(t)!r})',
+                  f'if kind is not END_TAG or content != {tag}:',
+                  '    raise _unexpected(error, kind)']
+        return lines
+
+    def _loop(self, lines: List[str], kind: str, what: str,
+              read: List[str], path: str, root: bool) -> None:
+        """Add the parsing of the members of a container to ``lines``.
+
+        ``read`` reads one member, ``path`` is its key in error paths.
+        """
+        lines += ['    if kind is START_TAG:',
+                  '        try:',
+                  '            while kind is START_TAG:']
+        lines += ['                ' + line for line in read]
+        lines += ['                content, kind = get_token()',
+                  '        except ZmlDecodeError as e:',
+                  f'            e.path = ({path},) + e.path',
+                  '            raise']
+        if not root:
+            lines += [f'    elif kind is {kind}:',
+                      '        content, kind = get_token()']
+        lines += ['    else:',
+                  f'        raise _expected(error, kind, {what!r})']
+        if root:
+            lines += ['    if kind is not EOF:',
+                      '        raise _unexpected(error, kind)']
+        else:
+            lines += ['    if kind is not END_TAG or content != tag:',
+                      '        raise _unexpected(error, kind)']
+
+    def _object(self, name: str, schema, root: bool = False) -> List[str]:
+        members = _members(schema)
+        is_class = not (isinstance(schema, dict) or _is_typed_dict(schema)
+                        or self.plain)
+        lines = [f'def {name}(content, kind, tag):']
+        targets = {}
+        for i, (tag, (_, _, default, _)) in enumerate(members.items()):
+            if is_class:
+                targets[tag] = f'f{i}'
+                value = ('_MISSING' if default is _MISSING
+                         else self.constant(default))
+                lines.append(f'    f{i} = {value}')
+            else:
+                targets[tag] = f'd[{tag!r}]'
+        if not is_class:
+            lines.append('    d = {}')
+        read = ['name = content']
+        for i, (tag, (t, _, _, _)) in enumerate(members.items()):
+            read.append(f'{"el" if i else ""}if content == {tag!r}:')
+            read += ['    ' + line
+                     for line in self.value(t, targets[tag], 'name')]
+        read += ['elif not content:' if members else 'if not content:',
+                 "    raise error('anonymous member in an object')",
+                 'else:',
+                 '    d[name] = _any(get_token, error, *get_token(), name)'
+                 if self.plain else '    skip(content)']
+        self._loop(lines, 'EMPTY_OBJ', 'an object', read, 'name', root)
+        for tag, (_, required, _, factory) in members.items():
+            if required:
+                check = (f'{targets[tag]} is _MISSING' if is_class
+                         else f'{tag!r} not in d')
+                lines += [f'    if {check}:',
+                          f'        raise error({"missing member " + tag!r})']
+            elif factory is not None and is_class:
+                lines += [f'    if {targets[tag]} is _MISSING:',
+                          f'        {targets[tag]} = {self.constant(factory)}()']
+        if is_class:
+            args = ', '.join(f'{tag}={targets[tag]}' for tag in members)
+            lines.append(f'    return {self.constant(schema)}({args})')
+        else:
+            lines.append('    return d')
+        return lines
+
+    def _array(self, name: str, item) -> List[str]:
+        lines = [f'def {name}(content, kind, tag):',
+                 '    lst = []']
+        read = ['if content:',
+                "    raise error('named member in an array')"]
+        read += self.value(item, 'item', "''")
+        read.append('lst.append(item)')
+        self._loop(lines, 'EMPTY_ARR', 'an array', read, 'len(lst)', False)
+        lines.append('    return lst')
+        return lines
+
+    def _mapping(self, name: str, value, root: bool = False) -> List[str]:
+        lines = [f'def {name}(content, kind, tag):',
+                 '    d = {}']
+        read = ['name = content',
+                'if not content:',
+                "    raise error('anonymous member in an object')"]
+        read += self.value(value, 'd[name]', 'name')
+        self._loop(lines, 'EMPTY_OBJ', 'an object', read, 'name', root)
+        lines.append('    return d')
+        return lines
+
+    def compile(self, schema) -> Callable:
+        """Return ``make(get_token, skip, error)``, which returns the parser."""
+        if _is_object(schema):
+            root = self._object('_root', schema, root=True)
+        elif schema is dict or _origin(schema) in (dict, Dict):
+            args = getattr(schema, '__args__', None) or (str, Any)
+            root = self._mapping('_root', args[1], root=True)
+        else:
+            raise TypeError(f'the schema of a document must describe an '
+                            f'object, not {schema!r}')
+        lines = ['def _make(get_token, skip, error):']
+        lines += ['    {0} = T.{0}'.format(kind) for kind in (
+            'START_TAG', 'END_TAG', 'INT', 'FLOAT', 'STRING', 'BOOL', 'NULL',
+            'EMPTY_ARR', 'EMPTY_OBJ', 'EOF')]
+        for function in self.functions + [root]:
+            lines += ['    ' + line for line in function]
+        lines += ['    def _load():',
+                  '        content, kind = get_token()',
+                  '        if kind is EOF:',
+                  "            raise error('empty document', True)",
+                  '        return _root(content, kind, None)',
+                  '    return _load']
+        self.namespace['T'] = T
+        self.source = '\n'.join(lines) + '\n'
+        exec(compile(self.source, '<zml loader>', 'exec'), self.namespace)
+        return self.namespace['_make']
+
+
+_loaders = {}
+
+
+def compile_loader(schema, engine: str = 'scanner') -> Callable[[Any], Any]:
+    """Return a function that decodes a ZML document of the shape ``schema``.
+
+    ``schema`` describes the top-level object.  It is a dataclass, whose
+    fields are filled from the members with the same tags; a ``TypedDict``;
+    a dict mapping tags to types, whose members are all required; or
+    ``Dict[str, X]``.  Member types can be ``int``, ``float`` (ints are
+    accepted), ``str``, ``bool``, ``None``, unions of these, ``Optional[X]``,
+    ``List[X]``, ``Dict[str, X]``, ``Any`` and the object schemas above,
+    nested to any depth.
+
+    The returned function takes the text of a document, as :func:`loads`
+    with the given ``engine`` does, and returns the dataclass instance or
+    dict.  Members that are not in the schema are skipped without being
+    decoded.  A missing required member, or a value of the wrong type,
+    raises :class:`~zen_markup_lang.errors.ZmlDecodeError`.
+
+    The parser is generated once per schema and engine and cached.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f'unknown engine {engine!r}')
+    try:
+        return _loaders[schema, engine]
+    except (KeyError, TypeError):
+        pass
+    make = _Compiler().compile(schema)
+    lexer_class = ENGINES[engine]
+
+    def loader(s):
+        lexer = lexer_class()
+        lexer.input(s)
+        return make(lexer.get_token, lexer.skip_element, lexer.error)()
+    try:
+        _loaders[schema, engine] = loader
+    except TypeError:
+        # a dict schema cannot be cached
+        pass
+    return loader
+
+
+# loaded value class -> the scalar types that accept it
+_CLASSES = {int: (int,), float: (float, int), str: (str,), bool: (bool,),
+            type(None): (type(None),)}
+
+# the containers a decoded array can be, see numeric_arrays and ZmlCache
+_ARRAYS = (list, tuple, array.array)
+
+Errors = List[Tuple[Path, str]]
+
+
+def _classes(t) -> Optional[frozenset]:
+    """The classes of the values of a scalar type, None if not one."""
+    if isinstance(t, type) and t in _CLASSES:
+        return frozenset(_CLASSES[t])
+    if _origin(t) is Union:
+        classes = set()
+        for arg in t.__args__:
+            sub = _classes(arg)
+            if sub is None:
+                return None
+            classes |= sub
+        return frozenset(classes)
+    return None
+
+
+def _prefix(key, errors: Errors) -> Errors:
+    return [((key,) + path, msg) for path, msg in errors]
+
+
+def _checker(t, memo: dict) -> Callable[[Any], Optional[Errors]]:
+    """Return a function that lists the errors of a decoded value of type ``t``.
+
+    The function returns a false value when there are none, so checking a
+    valid tree allocates nothing but the empty lists.  ``memo`` maps the ids
+    of the object schemas to ``(schema, checker)``, for recursive schemas.
+    """
+    classes = _classes(t)
+    if classes is not None:
+        msg = f'expected {_describe(t)}'
+
+        def check(value):
+            if value.__class__ not in classes:
+                return [((), msg)]
+        return check
+    if t is Any:
+        return lambda value: None
+    origin = _origin(t)
+    if origin is Union:
+        args = [a for a in t.__args__ if a is not type(None)]
+        if len(args) != 1:
+            raise TypeError(f'unsupported union {t!r}')
+        inner = _checker(args[0], memo)
+
+        def check(value):
+            if value is not None:
+                return inner(value)
+        return check
+    if _is_object(t):
+        if id(t) in memo:
+            return memo[id(t)][1]
+        # (tag, classes of a scalar or None, checker, message, required)
+        members = []
+
+        def check(value):
+            if not isinstance(value, Mapping):
+                return [((), 'expected an object')]
+            errors = []
+            for tag, classes, check_member, msg, required in members:
+                v = value.get(tag, _MISSING)
+                if v is _MISSING:
+                    if required:
+                        errors.append(((), f'missing member {tag}'))
+                elif classes is not None:
+                    if v.__class__ not in classes:
+                        errors.append(((tag,), msg))
+                else:
+                    e = check_member(v)
+                    if e:
+                        errors += _prefix(tag, e)
+            return errors
+        # the schema is kept so that its id stays unique
+        memo[id(t)] = (t, check)
+        for tag, (member, required, _, _) in _members(t).items():
+            classes = _classes(member)
+            members.append((
+                tag, classes, _checker(member, memo),
+                classes and f'expected {_describe(member)}', required))
+        return check
+    if t is list or origin in (list, List):
+        item = (getattr(t, '__args__', None) or (Any,))[0]
+        classes = _classes(item)
+        if classes is not None:
+            msg = f'expected {_describe(item)}'
+
+            def check(value):
+                if not isinstance(value, _ARRAYS):
+                    return [((), 'expected an array')]
+                return [((i,), msg) for i, v in enumerate(value)
+                        if v.__class__ not in classes]
+            return check
+        check_item = _checker(item, memo)
+
+        def check(value):
+            if not isinstance(value, _ARRAYS):
+                return [((), 'expected an array')]
+            errors = []
+            for i, v in enumerate(value):
+                e = check_item(v)
+                if e:
+                    errors += _prefix(i, e)
+            return errors
+        return check
+    if t is dict or origin in (dict, Dict):
+        args = getattr(t, '__args__', None) or (str, Any)
+        if args[0] is not str:
+            raise TypeError(f'object keys must be str, not {args[0]!r}')
+        check_value = _checker(args[1], memo)
+
+        def check(value):
+            if not isinstance(value, Mapping):
+                return [((), 'expected an object')]
+            errors = []
+            for k, v in value.items():
+                e = check_value(v)
+                if e:
+                    errors += _prefix(k, e)
+            return errors
+        return check
+    raise TypeError(f'unsupported type {t!r}')
+
+
+class Validator:
+    """A schema compiled for checking documents, see :func:`compile_validator`."""
+
+    def __init__(self, schema):
+        if not (_is_object(schema) or schema is dict
+                or _origin(schema) in (dict, Dict)):
+            raise TypeError(f'the schema of a document must describe an '
+                            f'object, not {schema!r}')
+        self.schema = schema
+        self._check = _checker(schema, {})
+        self._make = None
+
+    def errors(self, tree: Any) -> Errors:
+        """Return every mismatch of a decoded document as ``(path, message)``."""
+        return list(self._check(tree) or ())
+
+    def validate(self, tree: Any) -> Any:
+        """Return ``tree``, or raise :class:`ZmlSchemaError` with all errors."""
+        errors = self._check(tree)
+        if errors:
+            raise ZmlSchemaError(list(errors))
+        return tree
+
+    def loads(self, s, engine: str = 'scanner') -> Dict:
+        """Decode and check a document in one pass, as dicts and lists.
+
+        The result is what :func:`loads` returns, but a value of the wrong
+        type raises :class:`~zen_markup_lang.errors.ZmlDecodeError` at its
+        first token, with its position and path.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f'unknown engine {engine!r}')
+        if self._make is None:
+            self._make = _Compiler(plain=True).compile(self.schema)
+        lexer = ENGINES[engine]()
+        lexer.input(s)
+        return self._make(lexer.get_token, lexer.skip_element, lexer.error)()
+
+    def load(self, fp, engine: str = 'scanner') -> Dict:
+        """Like :meth:`loads`, reading the document from a stream."""
+        return self.loads(fp.read(), engine)
+
+
+_validators = {}
+
+
+def compile_validator(schema) -> Validator:
+    """Return a :class:`Validator` for documents of the shape ``schema``.
+
+    The schemas are those of :func:`compile_loader`, but the documents are
+    checked rather than converted: ints, floats, strings and so on stay as
+    :func:`loads` decodes them, and members that are not in the schema are
+    allowed.  :meth:`Validator.loads` checks while parsing and fails at the
+    first bad token; :meth:`Validator.errors` checks a decoded document (or
+    a ``ZmlCache`` snapshot) and reports every error with its path.
+
+    Validators are cached per schema.
+    """
+    try:
+        return _validators[schema]
+    except (KeyError, TypeError):
+        pass
+    validator = Validator(schema)
+    try:
+        _validators[schema] = validator
+    except TypeError:
+        # a dict schema cannot be cached
+        pass
+    return validator
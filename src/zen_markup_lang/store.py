@@ -0,0 +1,284 @@
+import array
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Callable, List, Optional, Tuple, Union
+from .cache import _freeze
+from .zml import load_path
+
+# inotify(7) events that can mean the watched file changed
+_IN_MODIFY = 0x2
+_IN_ATTRIB = 0x4
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM
+            | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE)
+
+_MISSING = object()
+
+
+class _Inotify:
+    """Wait for changes in a directory with Linux inotify, through ctypes."""
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        # The directory is watched rather than the file, so that a file
+        # replaced by a rename is still seen.
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory),
+                                  _IN_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, 'inotify_add_watch failed')
+
+    def wait(self, timeout: float) -> None:
+        if select.select([self._fd], [], [], timeout)[0]:
+            try:
+                while os.read(self._fd, 1 << 16):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _Poll:
+    """Wait for the polling interval, or until the store is stopped."""
+
+    def __init__(self, stop: threading.Event):
+        self._stop = stop
+
+    def wait(self, timeout: float) -> None:
+        self._stop.wait(timeout)
+
+    def close(self) -> None:
+        pass
+
+
+def _split(path: str) -> Tuple[str, ...]:
+    return tuple(path.split('.')) if path else ()
+
+
+def _lookup(tree: Any, keys: Tuple[str, ...]) -> Any:
+    for k in keys:
+        if not isinstance(tree, Mapping) or k not in tree:
+            return _MISSING
+        tree = tree[k]
+    return tree
+
+
+def _same(old: Any, new: Any) -> bool:
+    """Whether two frozen values are equal and of the same types throughout.
+
+    Plain ``==`` would take ``(1, 0)`` for ``(True, False)`` or ``(1.0,)``.
+    """
+    if type(old) is not type(new):
+        return False
+    if isinstance(new, tuple):
+        return len(old) == len(new) and all(map(_same, old, new))
+    if isinstance(new, Mapping):
+        return (list(old) == list(new)
+                and all(_same(old[k], v) for k, v in new.items()))
+    if isinstance(new, array.array):
+        return old.typecode == new.typecode and old == new
+    if hasattr(new, 'dtype'):
+        # a NumPy array, see numeric_arrays
+        return (old.dtype == new.dtype and old.shape == new.shape
+                and bool((old == new).all()))
+    return old == new
+
+
+def _merge(old: Any, new: Any, path: Tuple[str, ...],
+           changed: List[Tuple[str, ...]]) -> Any:
+    """Freeze ``new``, sharing the subtrees that are equal in ``old``.
+
+    The paths of the members that were added, removed or changed are
+    appended to ``changed``; objects are compared member by member, any
+    other value as a whole.
+    """
+    if isinstance(new, dict) and isinstance(old, Mapping):
+        members = {}
+        same = list(old) == list(new)
+        for k, v in new.items():
+            if k in old:
+                members[k] = _merge(old[k], v, path + (k,), changed)
+                same = same and members[k] is old[k]
+            else:
+                members[k] = _freeze(v)
+                changed.append(path + (k,))
+        for k in old:
+            if k not in new:
+                changed.append(path + (k,))
+        return old if same else MappingProxyType(members)
+    new = _freeze(new)
+    if _same(old, new):
+        return old
+    changed.append(path)
+    return new
+
+
+class ConfigStore:
+    """An always up-to-date, read-only view of a ZML configuration file.
+
+    :attr:`snapshot` is the current document, frozen as by
+    ``ZmlCache(policy='frozen')``.  When the file changes a new snapshot is
+    built and published with a single attribute assignment, so readers in
+    other threads never lock and always see a complete document.  Subtrees
+    that did not change are shared with the previous snapshot.
+
+    :meth:`reload` checks the file now; :meth:`start` starts a daemon thread
+    that watches it, with inotify on Linux and by polling the file every
+    ``interval`` seconds elsewhere (``watcher='poll'`` forces polling).  A
+    change is only loaded once the file has been stable for ``settle``
+    seconds, to skip the states of a file that is being written; writing
+    a temporary file and renaming it over the old one is still the safe
+    way to update a configuration.  A document that fails to load is
+    kept out and the error stored in :attr:`last_error`.
+
+    Callbacks registered with :meth:`subscribe` for a dotted path are
+    called with the old and new values of that path when something in it
+    changed, in the thread that reloaded.  The other options are passed to
+    :func:`~zen_markup_lang.zml.load_path`.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike], interval: float = 1.0,
+                 settle: float = 0.05, watcher: str = 'auto', **options):
+        if watcher not in ('auto', 'inotify', 'poll'):
+            raise ValueError(f'unknown watcher {watcher!r}')
+        self.path = os.path.abspath(path)
+        self.interval = interval
+        self.settle = settle
+        self.watcher = watcher
+        self.last_error: Optional[Exception] = None
+        self._options = options
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._signature = self._stat()
+        self.snapshot = _freeze(load_path(self.path, **options))
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def get(self, path: str, default: Any = None) -> Any:
+        """Return the value at the dotted ``path`` of the current snapshot."""
+        value = _lookup(self.snapshot, _split(path))
+        return default if value is _MISSING else value
+
+    def subscribe(self, path: str,
+                  callback: Callable[[Any, Any], None]) -> Callable[[], None]:
+        """Call ``callback(old, new)`` when the value at ``path`` changes.
+
+        A missing value is passed as None.  Returns a function that cancels
+        the subscription.
+        """
+        keys = _split(path)
+        token = object()
+        with self._lock:
+            self._subscribers[token] = (keys, callback)
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers.pop(token, None)
+        return unsubscribe
+
+    def reload(self, force: bool = False) -> bool:
+        """Load the file again if it changed, return whether it did.
+
+        Parse errors are raised and leave the snapshot as it was; the
+        same version of the file is not tried again unless ``force``.
+        """
+        with self._lock:
+            signature = self._stat()
+            if signature == self._signature and not force:
+                return False
+            self._signature = signature
+            tree = load_path(self.path, **self._options)
+            old = self.snapshot
+            changed = []
+            self.snapshot = new = _merge(old, tree, (), changed)
+            subscribers = list(self._subscribers.values())
+        error = None
+        for keys, callback in subscribers:
+            n = len(keys)
+            if not any(c[:n] == keys or keys[:len(c)] == c for c in changed):
+                continue
+            before, after = _lookup(old, keys), _lookup(new, keys)
+            try:
+                callback(None if before is _MISSING else before,
+                         None if after is _MISSING else after)
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return bool(changed)
+
+    def _waiter(self):
+        if self.watcher != 'poll' and sys.platform.startswith('linux'):
+            try:
+                return _Inotify(os.path.dirname(self.path))
+            except (OSError, AttributeError):
+                if self.watcher == 'inotify':
+                    raise
+        elif self.watcher == 'inotify':
+            raise OSError('inotify is only available on Linux')
+        return _Poll(self._stop)
+
+    def _watch(self, waiter) -> None:
+        try:
+            while not self._stop.is_set():
+                waiter.wait(self.interval)
+                if self._stop.is_set() or self._stat() == self._signature:
+                    continue
+                # wait until the writer is done
+                signature = self._stat()
+                while not self._stop.wait(self.settle):
+                    if self._stat() == signature:
+                        break
+                    signature = self._stat()
+                try:
+                    self.reload()
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = e
+        finally:
+            waiter.close()
+
+    def start(self) -> 'ConfigStore':
+        """Start watching the file in a daemon thread."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._watch, args=(self._waiter(),), daemon=True,
+                name=f'ConfigStore({self.path})')
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop watching, waiting for the thread to finish."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'ConfigStore':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
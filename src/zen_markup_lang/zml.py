@@ -1,7 +1,18 @@
 from __future__ import annotations
-from io import StringIO, TextIOWrapper
-from typing import Any, Dict, List, Tuple, NoReturn, Union
-from .lexer import Lexer
+import mmap
+import os
+import re
+import sys
+from array import array
+from io import TextIOWrapper
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, NoReturn, Tuple, Union
+from .byte_scanner import ByteScanner
+from .errors import Path, ZmlDecodeError
+from .indexed import IndexedScanner
+from .lazy import LazyObject
+from .lexer import Lexer, escaping
+from .projection import Node, compile_projection
+from .scanner import Scanner
 
 AllTypes = Union['Object', 'Array', str, int, float, bool, None]
 Object = Dict[str, AllTypes]
@@ -24,73 +35,430 @@ class IWriteable:
         raise NotImplementedError()
 
 
+ENGINES = {'scanner': Scanner, 'ply': Lexer, 'indexed': IndexedScanner,
+           'bytes': ByteScanner}
+
+_NOTHING = object()
+
+# the classes of empty_obj and empty_arr values
+_EMPTY = (dict, list)
+
+# load options that can put other types than dict, list, str, int, float,
+# bool and None into a document
+_CUSTOM_TYPES = ('numeric_arrays', 'object_hook', 'object_pairs_hook',
+                 'parse_int', 'parse_float', 'parse_constant')
+
+
+def _packer(numeric_arrays: Optional[str]):
+    """Return a function that packs an all-int or all-float list.
+
+    The result is an ``array.array`` (``'q'`` or ``'d'``) for ``'array'`` and
+    a NumPy ``ndarray`` (int64 or float64) for ``'numpy'``; other lists, and
+    ints that do not fit 64 bits, are returned unchanged.
+    """
+    if numeric_arrays is None:
+        return None
+    if numeric_arrays == 'array':
+        def convert(lst, code):
+            return array(code, lst)
+    elif numeric_arrays == 'numpy':
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("numeric_arrays='numpy' requires NumPy") from None
+        dtypes = {'q': numpy.int64, 'd': numpy.float64}
+
+        def convert(lst, code):
+            return numpy.array(lst, dtype=dtypes[code])
+    else:
+        raise ValueError(f'unknown numeric_arrays mode {numeric_arrays!r}')
+
+    def pack(lst):
+        types = set(map(type, lst))
+        if len(types) != 1:
+            return lst
+        t = types.pop()
+        if t is int:
+            try:
+                return convert(lst, 'q')
+            except OverflowError:
+                return lst
+        if t is float:
+            return convert(lst, 'd')
+        return lst
+    return pack
+
+
+class _Pairs(dict):
+    """An object that also lists its members as ``(key, value)`` pairs.
+
+    Built instead of a dict when there is an ``object_pairs_hook``, which
+    must see every member, including those with a duplicate key.
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[str, Any]] = ()):
+        self.pairs = list(pairs)
+        super().__init__(self.pairs)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        dict.__setitem__(self, key, value)
+        self.pairs.append((key, value))
+
+    def replace_last(self, key: str, value: Any) -> None:
+        """Replace the value of the last member, a container just finished."""
+        dict.__setitem__(self, key, value)
+        self.pairs[-1] = (key, value)
+
+    def update(self, other) -> None:
+        for key, value in getattr(other, 'pairs', None) or other.items():
+            self[key] = value
+
+    def __reduce__(self):
+        return (_Pairs, (self.pairs,))
+
+
+def _finisher(pack, object_hook: Optional[Callable],
+              object_pairs_hook: Optional[Callable]):
+    """Return the function applied to every container as it closes.
+
+    None when there is nothing to do, so the parser can skip the call.
+    """
+    if object_pairs_hook is not None:
+        def hook(d):
+            return object_pairs_hook(d.pairs if d.__class__ is _Pairs
+                                     else list(d.items()))
+    else:
+        hook = object_hook
+    if pack is None and hook is None:
+        return None
+
+    def finish(container):
+        if container.__class__ is list:
+            return container if pack is None else pack(container)
+        return container if hook is None else hook(container)
+    return finish
+
+
+_CONSTANTS = {True: 'true', False: 'false', None: 'null'}
+
+
+def _hooked_tokens(get_token, parse_constant: Optional[Callable],
+                   finish):
+    """Wrap ``get_token`` to pass constants and ``empty_obj`` to the hooks."""
+    T = Lexer.Token
+
+    def hooked():
+        content, kind = get_token()
+        if kind is T.BOOL or kind is T.NULL:
+            if parse_constant is not None:
+                content = parse_constant(_CONSTANTS[content])
+        elif kind is T.EMPTY_OBJ and finish is not None:
+            content = finish(content)
+        return (content, kind)
+    return hooked
+
+
+def _error_path(stack: list, key: Optional[str]) -> Path:
+    """Return the path of the element being read from the parser state."""
+    path = []
+    for (parent, _, _), (_, tag, _) in zip(stack, stack[1:]):
+        # an open array item is the last one of its parent
+        path.append(tag if tag else len(parent) - 1)
+    if key is not None:
+        path.append(key if key else len(stack[-1][0]))
+    return tuple(path)
+
+
 class ZmlReader:
-    _TERMINATORS = {Lexer.Token.BOOL, Lexer.Token.INT,
-                    Lexer.Token.FLOAT, Lexer.Token.NULL, Lexer.Token.STRING,
-                    Lexer.Token.EMPTY_ARR, Lexer.Token.EMPTY_OBJ}
-
-    def __init__(self, readable: IReadable):
-        self._lexer = Lexer()
-        self._lexer.input(readable.read())
-
-    def _read_next(self, key: str) -> Any:
-        content, kind = self._lexer.get_token()
-        if kind in ZmlReader._TERMINATORS:
-            content2, kind2 = self._lexer.get_token()
-            if kind == Lexer.Token.STRING:
-                while kind2 == Lexer.Token.STRING:
-                    content += content2
-                    content2, kind2 = self._lexer.get_token()
-            if content2 != key or kind2 != Lexer.Token.END_TAG:
-                raise RuntimeError()
-            ret = content
-        elif kind == Lexer.Token.START_TAG:
-            if content != '':
-                ret, end_tag = self._read_object(content)
-            else:
-                ret, end_tag = self._read_array()
-            if end_tag != key:
-                raise RuntimeError()
-        else:
-            raise RuntimeError()
-        return ret
-
-    def _read_object(self, first_key: str) -> Tuple[Dict, str]:
-        ret = {first_key: self._read_next(first_key)}
-        while True:
-            content, kind = self._lexer.get_token()
-            if kind == Lexer.Token.START_TAG:
-                ret[content] = self._read_next(content)
-            elif kind == Lexer.Token.END_TAG:
-                return (ret, content)
-            elif kind == Lexer.Token.EOF:
-                return (ret, '')
-            else:
-                raise RuntimeError()
+    """Build the object tree of a ZML document.
 
-    def _read_array(self) -> Tuple[List, str]:
-        ret = [self._read_next('')]
-        while True:
-            content, kind = self._lexer.get_token()
-            if kind == Lexer.Token.START_TAG:
-                if content != '':
-                    raise RuntimeError()
-                ret.append(self._read_next(''))
-            elif kind == Lexer.Token.END_TAG:
-                return (ret, content)
-            elif kind == Lexer.Token.EOF:
-                return (ret, '')
-            else:
-                raise RuntimeError()
+    The parser is iterative: an explicit stack holds the containers that are
+    still open, so the nesting depth is only limited by ``max_depth`` (no
+    limit if None) and not by the Python recursion limit.  The parse state
+    lives on the instance between calls to :meth:`_parse`, which lets
+    :class:`ZmlFeedParser` resume it when more input arrives.
 
-    def read(self) -> Dict:
+    The decode hooks work as in :func:`json.load`, see :func:`load`.  When
+    none is set the parser runs without any per-token hook checks.
+    """
+
+    def __init__(self, readable: Optional[IReadable] = None,
+                 engine: str = 'scanner', max_depth: Optional[int] = None,
+                 projection: Optional[Node] = None,
+                 numeric_arrays: Optional[str] = None, *,
+                 object_hook: Optional[Callable] = None,
+                 object_pairs_hook: Optional[Callable] = None,
+                 parse_int: Optional[Callable] = None,
+                 parse_float: Optional[Callable] = None,
+                 parse_constant: Optional[Callable] = None):
+        if engine not in ENGINES:
+            raise ValueError(f'unknown engine {engine!r}')
+        self._lexer = ENGINES[engine]()
+        if readable is not None:
+            self._lexer.input_stream(readable)
+        self.max_depth = max_depth
+        self._projection = projection
+        self._finish = _finisher(_packer(numeric_arrays), object_hook,
+                                 object_pairs_hook)
+        if parse_int is not None or parse_float is not None:
+            self._lexer.set_number_parsers(parse_int, parse_float)
+        self._parse_constant = parse_constant
+        self._hook_tokens = parse_constant is not None or (
+            object_hook is not None or object_pairs_hook is not None)
+        self._pairs = None if object_pairs_hook is None else _Pairs
+        self._root = {} if self._pairs is None else _Pairs()
+        # (container, tag that closes it, projection node of its parent)
+        # for every open container
+        self._stack = [(self._root, None, None)]
+        # the tag whose value is being read, None between elements
+        self._key = None
+        self._value = _NOTHING
+        # projection nodes of the current container and of the value of key
+        self._node = projection
+        self._key_node = None
+
+    def input(self, s: str) -> None:
+        self._lexer.input(s)
+
+    def _parse(self, max_tokens: Optional[int] = None) -> bool:
+        """Consume tokens until the lexer reports EOF.
+
+        With ``max_tokens`` stop after that many tokens, and return True if
+        the budget ran out before the EOF.
+        """
+        T = Lexer.Token
+        get_token = self._lexer.get_token
+        budget = None
+        if max_tokens is not None:
+            budget = [max_tokens]
+            next_token = get_token
+
+            def get_token():
+                budget[0] -= 1
+                if budget[0] < 0:
+                    return (None, T.EOF)
+                return next_token()
+        if self._hook_tokens:
+            get_token = _hooked_tokens(get_token, self._parse_constant,
+                                       self._finish)
+        skip_element = self._lexer.skip_element
+        stack = self._stack
+        key = self._key
+        value = self._value
+        node = self._node
+        key_node = self._key_node
+        finish = self._finish
+        pairs = self._pairs
+        # the stack also holds the top-level object
+        limit = sys.maxsize if self.max_depth is None else self.max_depth + 1
+        error = self._lexer.error
+        try:
+            while True:
+                content, kind = get_token()
+                if kind is T.START_TAG:
+                    if key is None:
+                        container = stack[-1][0]
+                        # Objects have named members, arrays anonymous ones.
+                        if (not content) is (container.__class__ is not list):
+                            raise error('anonymous member in an object'
+                                        if not content else
+                                        'named member in an array')
+                    else:
+                        # The first member of a new container.
+                        if value is not _NOTHING:
+                            raise error('unexpected start tag after a value')
+                        if not content:
+                            container = []
+                        elif pairs is None:
+                            container = {}
+                        else:
+                            container = pairs()
+                        if key:
+                            stack[-1][0][key] = container
+                        else:
+                            stack[-1][0].append(container)
+                        stack.append((container, key, node))
+                        node = key_node
+                        key = None
+                        if len(stack) > limit:
+                            raise error('maximum nesting depth exceeded')
+                    if node is not None:
+                        key_node = node.get(content, node.default)
+                        if key_node is False:
+                            skip_element(content)
+                            continue
+                    key = content
+                elif kind is T.END_TAG:
+                    if key is None:
+                        if len(stack) == 1 or stack[-1][1] != content:
+                            raise error('unexpected end tag')
+                        container, _, node = stack.pop()
+                        if finish is not None:
+                            done = finish(container)
+                            if done is not container:
+                                if pairs is not None and content:
+                                    stack[-1][0].replace_last(content, done)
+                                elif content:
+                                    stack[-1][0][content] = done
+                                else:
+                                    stack[-1][0][-1] = done
+                        continue
+                    if content != key:
+                        raise error('unexpected end tag')
+                    if value is _NOTHING:
+                        raise error('missing value')
+                    # A scalar where an include expects a container is
+                    # dropped.  Excluding a path below a scalar keeps it,
+                    # and empty containers are kept as such.  key_node is
+                    # always None without a projection.
+                    if key_node is None or key_node.default is None or (
+                            value.__class__ in _EMPTY):
+                        if key:
+                            stack[-1][0][key] = value
+                        else:
+                            stack[-1][0].append(value)
+                    key = None
+                    value = _NOTHING
+                elif kind is T.EOF:
+                    break
+                else:
+                    if key is None:
+                        raise error('value outside of an element')
+                    if value is _NOTHING:
+                        value = content
+                    elif kind is T.STRING and value.__class__ is str:
+                        value += content
+                    else:
+                        raise error('unexpected value after a value')
+        except ZmlDecodeError as e:
+            e.path = _error_path(stack, key)
+            raise
+        self._key = key
+        self._value = value
+        self._node = node
+        self._key_node = key_node
+        return budget is not None and budget[0] < 0
+
+    def _read_members(self) -> Dict:
+        """Parse to the end and return the top-level members as a dict.
+
+        Unlike :meth:`read` the object hooks are not applied to the result,
+        so that the members of several parts can be merged first.
+        """
         # version = self._lexer.get_version()
         # if version.major != 0 or version.minor != 1:
         #     raise RuntimeError()
-        content, kind = self._lexer.get_token()
-        if kind != Lexer.Token.START_TAG:
-            raise RuntimeError()
-        return self._read_object(content)[0]
+        self._parse()
+        if self._key is not None or len(self._stack) != 1:
+            e = self._lexer.error('unexpected end of input', True)
+            e.path = _error_path(self._stack, self._key)
+            raise e
+        if not self._root and self._projection is None:
+            raise self._lexer.error('empty document', True)
+        return self._root
+
+    def read(self) -> Dict:
+        root = self._read_members()
+        if self._finish is not None:
+            return self._finish(root)
+        return root
+
+
+class ZmlFeedParser(ZmlReader):
+    """An incremental parser fed with :meth:`feed` and finished by :meth:`close`.
+
+    Useful when the document arrives in pieces, e.g. from a socket or a
+    pipe.  Complete lines are tokenized and folded into the result as soon
+    as they are fed, so only the current line and the tree built so far are
+    kept in memory.
+
+    To bound the time of a single call, e.g. on an event loop, pass
+    ``max_tokens`` to :meth:`feed` and :meth:`resume`: they return True
+    while tokens are left, which :meth:`resume` goes on parsing.  The last
+    line is only parsed after :meth:`feed_eof`, or by :meth:`close`.
+    """
+
+    def __init__(self, max_depth: Optional[int] = None, **options):
+        # the other options are those of ZmlReader, except the engine
+        if 'engine' in options:
+            raise TypeError('ZmlFeedParser always uses the scanner engine, '
+                            'it takes no engine argument')
+        super().__init__(max_depth=max_depth, **options)
+        self._lexer.feed('')
+
+    def feed(self, data: str, max_tokens: Optional[int] = None) -> bool:
+        self._lex(self._lexer.feed, data)
+        return self._parse(max_tokens)
+
+    def resume(self, max_tokens: Optional[int] = None) -> bool:
+        """Go on parsing the data fed so far, see :meth:`feed`."""
+        return self._parse(max_tokens)
+
+    def feed_eof(self) -> None:
+        """Mark the end of the input, without parsing the last line yet."""
+        if not self._lexer.eof:
+            self._lex(self._lexer.close)
+
+    def close(self) -> Object:
+        self.feed_eof()
+        return self.read()
+
+    def _lex(self, method: Callable, *args) -> None:
+        """Call a lexer method, which may go on skipping an excluded element."""
+        try:
+            method(*args)
+        except ZmlDecodeError as e:
+            e.path = _error_path(self._stack, self._key)
+            raise
+
+
+class ZmlDecoder:
+    """A reusable ZML decoder, in the spirit of ``json.JSONDecoder``.
+
+    The decoder only stores its configuration; every call to :meth:`decode`
+    gets a fresh tokenizer cursor over the shared lexer tables, so a single
+    instance can be used repeatedly and from several threads at once.
+    ``include`` and ``exclude`` are compiled once, see :func:`load`.
+    """
+
+    def __init__(self, engine: str = 'scanner',
+                 max_depth: Optional[int] = None,
+                 include: Optional[Iterable[str]] = None,
+                 exclude: Optional[Iterable[str]] = None,
+                 numeric_arrays: Optional[str] = None, *,
+                 object_hook: Optional[Callable] = None,
+                 object_pairs_hook: Optional[Callable] = None,
+                 parse_int: Optional[Callable] = None,
+                 parse_float: Optional[Callable] = None,
+                 parse_constant: Optional[Callable] = None):
+        if engine not in ENGINES:
+            raise ValueError(f'unknown engine {engine!r}')
+        self.engine = engine
+        self.max_depth = max_depth
+        self.numeric_arrays = numeric_arrays
+        self.object_hook = object_hook
+        self.object_pairs_hook = object_pairs_hook
+        self.parse_int = parse_int
+        self.parse_float = parse_float
+        self.parse_constant = parse_constant
+        self._projection = compile_projection(include, exclude)
+        # fail early on a bad mode or a missing NumPy
+        _packer(numeric_arrays)
+
+    def decode(self, s: str) -> Object:
+        reader = ZmlReader(engine=self.engine, max_depth=self.max_depth,
+                           projection=self._projection,
+                           numeric_arrays=self.numeric_arrays,
+                           object_hook=self.object_hook,
+                           object_pairs_hook=self.object_pairs_hook,
+                           parse_int=self.parse_int,
+                           parse_float=self.parse_float,
+                           parse_constant=self.parse_constant)
+        reader.input(s)
+        return reader.read()
+
+
+_default_decoder = ZmlDecoder()
 
 
 _DIGITS = {chr(ord('0') + i) for i in range(10)}
@@ -106,99 +474,225 @@ def is_identifier(s: str) -> bool:
 
 def dump(d: Object, fp: IWriteable) -> None:
     # fp.write('<!zml 0.1>\n')
-    _dump(d, fp, 0)
+    for piece in _dump(d, 0):
+        fp.write(piece)
 
 
 def dumps(d: Object) -> str:
-    ss = StringIO()
-    dump(d, ss)
-    return ss.read()
+    return ''.join(_dump(d, 0))
+
+
+# (character, escape sequence) pairs derived from the lexer's table, with
+# the backslash first so the escapes added later are not escaped again.
+_ESCAPES = sorted(((v, '\\' + k) for k, v in escaping.items()),
+                  key=lambda x: x[0] != '\\')
+_needs_escape = re.compile(
+    '[%s]' % re.escape(''.join(escaping.values()))).search
 
 
 def to_zml_str(s: str) -> str:
-    a = ['"']
-    for i in s:
-        if i == '\\':
-            a.append('\\\\')
-        elif i == '\n':
-            a.append('\\n')
-        elif i == '\t':
-            a.append('\\t')
-        elif i == '\b':
-            a.append('\\b')
-        elif i == '\r':
-            a.append('\\r')
-        elif i == '"':
-            a.append('\\"')
-        else:
-            a.append(i)
-    a.append('"')
-    return ''.join(a)
+    if _needs_escape(s):
+        for k, v in _ESCAPES:
+            s = s.replace(k, v)
+    return '"' + s + '"'
 
 
 indent = ' ' * 4
 
 
-def _dump(elem: Any, fp: IWriteable, level: int) -> None:
+def _dump(elem: Any, level: int) -> Iterator[str]:
+    """Yield the text of ``elem`` in pieces, about one per line.
+
+    A generator, so :func:`~zen_markup_lang.aio.adump` can give control
+    back to the event loop inside a large container.
+    """
     if isinstance(elem, dict):
         if not elem:
-            fp.write(indent * level + 'empty_obj\n')
+            yield indent * level + 'empty_obj\n'
             return
         for k, v in elem.items():
             if not is_identifier(k):
                 raise RuntimeError()
-            fp.write(indent * level + f'<{k}>')
-            if not (isinstance(v, (int, float, bool, str)) or v is None):
-                fp.write('\n')
-            _dump(v, fp, level + 1)
-            if not (isinstance(v, (int, float, bool, str)) or v is None):
-                fp.write(indent * level)
-            fp.write(f'</{k}>\n')
-    elif isinstance(elem, list):
+            if isinstance(v, (int, float, bool, str)) or v is None:
+                yield indent * level + f'<{k}>' + _scalar(v) + f'</{k}>\n'
+            else:
+                yield indent * level + f'<{k}>\n'
+                yield from _dump(v, level + 1)
+                yield indent * level + f'</{k}>\n'
+    elif isinstance(elem, (list, array)):
         if not elem:
-            fp.write(indent * level + 'empty_arr\n')
+            yield indent * level + 'empty_arr\n'
             return
         for i in elem:
-            fp.write(indent * level + f'<>')
-            if not (isinstance(i, (int, float, bool, str)) or i is None):
-                fp.write('\n')
-            _dump(i, fp, level + 1)
-            if not (isinstance(i, (int, float, bool, str)) or i is None):
-                fp.write(indent * level)
-            fp.write(f'</>\n')
-    elif isinstance(elem, bool):
-        fp.write(' true ' if elem else ' false ')
-    elif isinstance(elem, (int, float)):
-        fp.write(' ' + str(elem) + ' ')
-    elif elem is None:
-        fp.write(' null ')
-    elif isinstance(elem, str):
-        fp.write(' ' + to_zml_str(elem) + ' ')
+            if isinstance(i, (int, float, bool, str)) or i is None:
+                yield indent * level + '<>' + _scalar(i) + '</>\n'
+            else:
+                yield indent * level + '<>\n'
+                yield from _dump(i, level + 1)
+                yield indent * level + '</>\n'
+    elif hasattr(elem, 'tolist'):
+        # NumPy arrays, as loaded with numeric_arrays='numpy'
+        yield from _dump(elem.tolist(), level)
     else:
-        raise RuntimeError()
-
-
-def load(fp: IReadable) -> Object:
-    """Summary line.
-
-    Extended description of function.
+        yield _scalar(elem)
+
+
+def _scalar(elem: Any) -> str:
+    if isinstance(elem, bool):
+        return ' true ' if elem else ' false '
+    if isinstance(elem, (int, float)):
+        return ' ' + str(elem) + ' '
+    if elem is None:
+        return ' null '
+    if isinstance(elem, str):
+        return ' ' + to_zml_str(elem) + ' '
+    raise RuntimeError()
+
+
+def load(fp: IReadable, engine: str = 'scanner',
+         max_depth: Optional[int] = None, lazy: bool = False,
+         include: Optional[Iterable[str]] = None,
+         exclude: Optional[Iterable[str]] = None,
+         numeric_arrays: Optional[str] = None, *,
+         object_hook: Optional[Callable] = None,
+         object_pairs_hook: Optional[Callable] = None,
+         parse_int: Optional[Callable] = None,
+         parse_float: Optional[Callable] = None,
+         parse_constant: Optional[Callable] = None) -> Object:
+    """Deserialize a ZML document from a text stream.
 
     Parameters
     ----------
-    arg1 : int
-        Description of arg1
-    arg2 : str
-        Description of arg2
+    fp : IReadable
+        The stream to read the document from.
+    engine : str
+        The tokenizer to use: ``'scanner'`` (the default, a single regex
+        driven scanner that streams its input), ``'indexed'`` (splits the
+        whole input into tokens up front; about as fast as the scanner,
+        within a few percent either way, and it holds every token string
+        in memory until the parse ends),
+        ``'bytes'`` (lexes UTF-8 bytes, also reads binary streams, see
+        :func:`load_path`) or ``'ply'`` (the PLY generated lexer).
+    max_depth : int, optional
+        The maximum nesting depth of containers, unlimited if None.
+    lazy : bool
+        If true, return a read-only :class:`~zen_markup_lang.lazy.LazyObject`
+        that decodes each value the first time it is accessed.  The whole
+        text is kept in memory and the other options are ignored.
+    include : iterable of str, optional
+        Dotted paths of the members to load, e.g. ``['db.primary']``.  Their
+        ancestors are loaded as containers holding only the included
+        members.  Everything is loaded if None.
+    exclude : iterable of str, optional
+        Dotted paths of members to leave out.  Skipped elements are stepped
+        over by matching tags only, their values are not validated.
+    numeric_arrays : {None, 'array', 'numpy'}
+        How to load arrays whose items are all ints or all floats: as lists
+        (the default), as ``array.array`` of typecode ``'q'`` or ``'d'``, or
+        as NumPy ``ndarray`` of int64 or float64.  Ints that do not fit in 64
+        bits keep the array a list.  ``'numpy'`` requires NumPy.
+    object_hook : callable, optional
+        Called with every decoded object (including ``empty_obj``) as soon
+        as it is complete, its return value is used instead of the dict.
+    object_pairs_hook : callable, optional
+        Like ``object_hook`` but called with a list of ``(key, value)``
+        pairs.  Takes priority over ``object_hook``.
+    parse_int, parse_float : callable, optional
+        Called with the text of every int or float, underscores removed,
+        e.g. ``parse_float=decimal.Decimal``.
+    parse_constant : callable, optional
+        Called with ``'true'``, ``'false'`` or ``'null'`` for every
+        constant.
 
     Returns
     -------
-    bool
-        Description of return value
+    Object
+        The decoded document.
 
     """
-    return ZmlReader(fp).read()
-
-
-def loads(s: str) -> Object:
-    ss = StringIO(s)
-    return load(ss)
+    if lazy:
+        return LazyObject(fp.read())
+    return ZmlReader(fp, engine, max_depth,
+                     compile_projection(include, exclude), numeric_arrays,
+                     object_hook=object_hook,
+                     object_pairs_hook=object_pairs_hook,
+                     parse_int=parse_int, parse_float=parse_float,
+                     parse_constant=parse_constant).read()
+
+
+def loads(s: str, engine: str = 'scanner',
+          max_depth: Optional[int] = None, lazy: bool = False,
+          include: Optional[Iterable[str]] = None,
+          exclude: Optional[Iterable[str]] = None,
+          numeric_arrays: Optional[str] = None, *,
+          object_hook: Optional[Callable] = None,
+          object_pairs_hook: Optional[Callable] = None,
+          parse_int: Optional[Callable] = None,
+          parse_float: Optional[Callable] = None,
+          parse_constant: Optional[Callable] = None) -> Object:
+    if lazy:
+        return LazyObject(s)
+    if engine == _default_decoder.engine and all(x is None for x in (
+            max_depth, include, exclude, numeric_arrays, object_hook,
+            object_pairs_hook, parse_int, parse_float, parse_constant)):
+        return _default_decoder.decode(s)
+    return ZmlDecoder(engine, max_depth, include, exclude, numeric_arrays,
+                      object_hook=object_hook,
+                      object_pairs_hook=object_pairs_hook,
+                      parse_int=parse_int, parse_float=parse_float,
+                      parse_constant=parse_constant).decode(s)
+
+
+def load_path(path: Union[str, os.PathLike], *,
+              include: Optional[Iterable[str]] = None,
+              exclude: Optional[Iterable[str]] = None,
+              cache: Union[bool, str, os.PathLike] = False,
+              **options) -> Object:
+    """Load the ZML file at ``path`` through a read-only memory map.
+
+    The mapped UTF-8 bytes are lexed in place by the ``'bytes'`` engine, so
+    the file is neither read into a buffer nor decoded into one large
+    ``str``; processes loading the same file share its pages in the page
+    cache.  ``include``, ``exclude`` and the other options are as for
+    :func:`load`, except ``engine`` and ``lazy``.
+
+    With ``cache`` the parsed tree is also stored marshalled on disk and
+    reused by later loads of the same content, in ``__zmlcache__`` next to
+    the file if ``cache`` is True, or in the directory ``cache`` names.  See
+    :mod:`zen_markup_lang.disk_cache`.  The options that return custom
+    types, such as the hooks, cannot be combined with it.
+    """
+    if cache is not False:
+        bad = [k for k in _CUSTOM_TYPES if options.get(k) is not None]
+        if bad:
+            raise ValueError(f'{bad[0]} cannot be used with cache')
+        include = None if include is None else list(include)
+        exclude = None if exclude is None else list(exclude)
+    reader = ZmlReader(engine='bytes',
+                       projection=compile_projection(include, exclude),
+                       **options)
+    with open(path, 'rb') as f:
+        # empty files cannot be mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            return reader.read()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            try:
+                if cache is False:
+                    reader.input(mm)
+                    return reader.read()
+                # hashlib and tempfile are only imported when caching
+                from . import disk_cache
+                cached = disk_cache.cache_path(
+                    path, None if cache is True else os.fspath(cache))
+                key = disk_cache.make_key(
+                    mm, dict(options, include=include, exclude=exclude))
+                tree = disk_cache.read(cached, key)
+                if tree is None:
+                    reader.input(mm)
+                    tree = reader.read()
+                    disk_cache.write(cached, key, tree)
+                return tree
+            except ZmlDecodeError as e:
+                # the error cannot refer to the map once it is closed
+                e._detach()
+                raise
@@ -1,7 +1,19 @@
 import zen_markup_lang as zml
+from zen_markup_lang.lexer import Lexer, unescape
+from zen_markup_lang.byte_scanner import ByteScanner
+from zen_markup_lang.indexed import IndexedScanner
+from zen_markup_lang.scanner import Scanner
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
 import pathlib
+import pickle
+import pytest
+import random
+import subprocess
+import sys
 
 HERE = pathlib.Path(__file__).resolve().parent
+ENGINES = ('scanner', 'ply', 'indexed', 'bytes')
 
 
 def test_zml():
@@ -14,3 +26,834 @@ def test_zml():
         zml.dump(t, f)
     with open(HERE / 'test2.zml') as f:
         assert zml.load(f) == t
+
+
+def _tokens(lexer, s):
+    if s:
+        lexer.input(s)
+    ret = []
+    while True:
+        content, kind = lexer.get_token()
+        ret.append((content, kind))
+        if kind == Lexer.Token.EOF:
+            return ret
+
+
+def test_scanner_matches_ply():
+    with open(HERE / 'test.zml') as f:
+        s = f.read()
+    s += '\n# comment\n<x> 0.5 0 1_0 "a\\"b" `c` </x>\r\n<y>truefalse</y>\n'
+    assert _tokens(Scanner(), s) == _tokens(Lexer(), s)
+    assert _tokens(IndexedScanner(), s) == _tokens(Lexer(), s)
+    assert _tokens(ByteScanner(), s) == _tokens(Lexer(), s)
+    for engine in ENGINES:
+        with open(HERE / 'test.zml') as f:
+            assert zml.load(f, engine)['g']['f'] == ['hello\t', 'world!\\']
+
+
+def test_scanner_error():
+    for lexer in (Scanner(), IndexedScanner(), ByteScanner()):
+        with pytest.raises(RuntimeError, match='illegal character ! in line 3'):
+            _tokens(lexer, '<a> 1 </a>\n# comment\n   !')
+    for bad in ('<1>', '"abc', '`', '# x', 'tru', '"\\q"'):
+        for lexer in (IndexedScanner(), ByteScanner()):
+            with pytest.raises(RuntimeError, match='illegal character'):
+                _tokens(lexer, '<a> 1 </a> ' + bad)
+    with pytest.raises(ValueError):
+        zml.loads('<a> 1 </a>', engine='nope')
+
+
+def test_decode_error(tmp_path):
+    s = '<a>\n  <b> 1 </b>\n  <c><> 1 </><> é </x></c>\n</a>'
+    path = tmp_path / 'a.zml'
+    path.write_text(s, encoding='utf-8')
+    errors = []
+    for engine in ENGINES:
+        with pytest.raises(zml.ZmlDecodeError) as info:
+            zml.loads(s, engine)
+        errors.append(info.value)
+    # nothing is counted until the position is read
+    assert errors[0].pos == s.index('é') and errors[0]._lineno is None
+    for load in (lambda: zml.load(StringIO(s)), lambda: zml.load_path(path)):
+        with pytest.raises(zml.ZmlDecodeError) as info:
+            load()
+        errors.append(info.value)
+    for e in errors:
+        assert (e.msg, e.lineno, e.colno, e.path) == (
+            'illegal character é', 3, 17, ('a', 'c', 1))
+        assert str(e) == 'illegal character é in line 3 column 17 at a.c.1'
+    e = pickle.loads(pickle.dumps(errors[0]))
+    assert (e.doc, e.pos, e.lineno, e.colno, e.path) == (
+        None, errors[0].pos, 3, 17, ('a', 'c', 1))
+    cases = [('<a>\n <b> 1 </b>\n <> 2 </>\n</a>', 'anonymous member in an object', 3, 2, ('a',)),
+             ('<a><> 1 </><b> 2 </b></a>', 'named member in an array', 1, 12, ('a',)),
+             ('<a> 1\n 2 </a>', 'unexpected value after a value', 2, 2, ('a',)),
+             ('<a><b> 1 </b>\n</c>', 'unexpected end tag', 2, 1, ('a',)),
+             ('<a> </a>', 'missing value', 1, 5, ('a',)),
+             ('<a><> 1 </>\n', 'unexpected end of input', 2, 1, ('a',)),
+             ('# nothing\n', 'empty document', 2, 1, ())]
+    for s, msg, lineno, colno, path in cases:
+        for engine in ENGINES:
+            with pytest.raises(zml.ZmlDecodeError) as info:
+                zml.loads(s, engine)
+            e = info.value
+            assert (e.msg, e.lineno, e.colno, e.path) == (msg, lineno, colno, path)
+        parser = zml.ZmlFeedParser()
+        with pytest.raises(zml.ZmlDecodeError) as info:
+            for c in s:
+                parser.feed(c)
+            parser.close()
+        e = info.value
+        assert (e.msg, e.lineno, e.colno, e.path) == (msg, lineno, colno, path)
+
+
+def test_decoder_reuse():
+    with open(HERE / 'test.zml') as f:
+        s = f.read()
+    expected = zml.loads(s)
+    for engine in ENGINES:
+        decoder = zml.ZmlDecoder(engine)
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(decoder.decode, [s] * 64))
+        assert all(r == expected for r in results)
+
+
+def test_lextab_up_to_date():
+    from zen_markup_lang import lexer
+    from zen_markup_lang.ply import lex
+    with open(lexer._lextab_path()) as f:
+        assert f.read() == lexer._lextab_source(lex.lex(module=lexer))
+
+
+def test_long_strings():
+    body = 'x' * 100000 + '\\"\\\\\\n\\b\\t' * 1000
+    expected = 'x' * 100000 + '"\\\n\b\t' * 1000
+    s = f'<a> "{body}" `{"y" * 100000}` </a>'
+    for engine in ENGINES:
+        assert zml.loads(s, engine) == {'a': expected + 'y' * 100000}
+    for bad in ('<a> "abc\n" </a>', '<a> "abc\\" </a>', '<a> "a\\qb" </a>'):
+        with pytest.raises(RuntimeError, match='illegal character "'):
+            zml.loads(bad)
+
+
+def _random_strings(seed, count, length):
+    rnd = random.Random(seed)
+    pools = ['abcXYZ 09_-', '\\"\n\t\b\r', '\0\x7f\u00e9\u4e2d\u6587\u2028',
+             '\U0001f600\U00010348', '`<>#']
+    for _ in range(count):
+        pool = ''.join(rnd.sample(pools, rnd.randint(1, len(pools))))
+        yield ''.join(rnd.choice(pool) for _ in range(rnd.randint(0, length)))
+
+
+def test_string_round_trip():
+    strings = list(_random_strings(0, 300, 200))
+    strings += ['\r', '\\r', '\\' * 5, '"' * 3, 'x' * 100000 + '\\\n' * 1000]
+    d = {f'k{i}': s for i, s in enumerate(strings)}
+    d['arr'] = strings
+    text = zml.dumps(d)
+    for engine in ENGINES:
+        assert zml.loads(text, engine) == d
+    for s in strings:
+        assert unescape(zml.zml.to_zml_str(s)[1:-1]) == s
+    assert unescape('\\q') is None
+    assert unescape('\0\\\\\\q') is None
+    assert unescape('\0\\\\\\r') == '\0\\\r'
+
+
+def test_streaming():
+    with open(HERE / 'test.zml') as f:
+        s = f.read()
+    s += '\n# comment\n<x> "a\\"b\\\\" `c` </x><z> 0.5 </z>\r\n<y> 1_0\n</y>' + ' ' * 100
+    expected = zml.loads(s)
+    for size in (1, 2, 3, 7, 64):
+        scanner = Scanner()
+        scanner.input_stream(StringIO(s), size)
+        assert _tokens(scanner, '') == _tokens(Scanner(), s)
+        parser = zml.ZmlFeedParser()
+        for i in range(0, len(s), size):
+            parser.feed(s[i:i+size])
+        assert parser.close() == expected
+        # at most size tokens at a time
+        parser = zml.ZmlFeedParser()
+        steps = 0
+        more = parser.feed(s, size)
+        parser.feed_eof()
+        while more or parser.resume(size):
+            more = False
+            steps += 1
+        assert parser.close() == expected and steps >= 60 // size
+    with pytest.raises(RuntimeError, match='illegal character ! in line 3'):
+        scanner = Scanner()
+        scanner.input_stream(StringIO('<a> 1 </a>\n\n  ! </a>'), 4)
+        _tokens(scanner, '')
+    for bad in ('', '<a> 1 </a></a>', '<a> 1', '<a><> 1 </></b>', '<a><b>1</b><>2</></a>',
+                '<a> 1 "x" </a>', '<a></a>', '<> 1 </>'):
+        parser = zml.ZmlFeedParser()
+        with pytest.raises(RuntimeError):
+            parser.feed(bad)
+            parser.close()
+    with pytest.raises(TypeError, match='engine'):
+        zml.ZmlFeedParser(engine='ply')
+
+
+def test_iterparse():
+    s = '<a> 1 </a><b><> "x" "y" </><><c> empty_arr </c></></b><d> null </d>'
+    assert list(zml.iterparse(StringIO(s))) == [
+        ('scalar', 'a', 1, 1),
+        ('start_array', 'b', None, 1),
+        ('scalar', 0, 'xy', 2),
+        ('start_object', 1, None, 2),
+        ('scalar', 'c', [], 3),
+        ('end', 1, None, 2),
+        ('end', 'b', None, 1),
+        ('scalar', 'd', None, 1),
+    ]
+    with open(HERE / 'test.zml') as f:
+        expected = zml.load(f)
+        f.seek(0)
+        reader = zml.iterparse(f)
+        d = {key: reader.read_value()
+             for event, key, value, depth in reader if event != 'end'}
+    assert d == expected
+    # stopping early leaves the rest of the input unread
+    events = zml.iterparse(StringIO('<a> 1 </a> ! garbage'))
+    assert next(events) == ('scalar', 'a', 1, 1)
+    # errors are those of load, with their position and path
+    cases = ['<a><b> 1 </b></c>', '<a><b> 1 </b><> 1 </></a>', '<a> 1 2 </a>',
+             '<a> 1 <b>', '<a><> 1 </><> 2 </><b> 1 </b></a>', '<a></a>',
+             '<a><b> 1 </b>', '', '1', '<a><> 1 </><x> 1 </x></a>']
+    for s in cases:
+        with pytest.raises(zml.ZmlDecodeError) as info:
+            list(zml.iterparse(StringIO(s)))
+        with pytest.raises(zml.ZmlDecodeError) as expected:
+            zml.loads(s)
+        e, f = info.value, expected.value
+        assert (e.msg, e.lineno, e.colno, e.path) == (
+            f.msg, f.lineno, f.colno, f.path)
+
+
+def test_deep_nesting():
+    depth = 5000
+    s = '<a>' * depth + ' 1 ' + '</a>' * depth
+    d = zml.loads(s)
+    for _ in range(depth - 1):
+        d = d['a']
+    assert d == {'a': 1}
+    s = '<a>' + '<>' * depth + ' 1 ' + '</>' * depth + '</a>'
+    assert zml.loads(s, max_depth=depth)
+    with pytest.raises(RuntimeError, match='depth'):
+        zml.loads(s, max_depth=depth - 1)
+
+
+def test_lazy():
+    with open(HERE / 'test.zml') as f:
+        s = f.read()
+    d = zml.loads(s, lazy=True)
+    assert d == zml.loads(s)
+    assert d.materialize() == zml.loads(s)
+    assert list(d) == list('abcdefghi')
+    assert d['f'][-1] == 'world!\\'
+    assert d['g']['f'][0:2] == ['hello\t', 'world!\\']
+    assert d['g'] is d['g']
+    # values are only decoded when accessed
+    d = zml.loads('<a> 1 </a><b> 1x </b><c><> "<d>" </></c>', lazy=True)
+    assert d['a'] == 1 and d['c'] == ['<d>']
+    with pytest.raises(RuntimeError):
+        d['b']
+    for bad in ('<a> 1 </b>', '<a> 1 </a> 2', '<a> "x </a>', '<a><b>1</b> 2 </a>'):
+        with pytest.raises(RuntimeError):
+            zml.loads(bad, lazy=True)['a']
+    # errors carry their message and position
+    cases = [('<a> 1 </b>', 'unexpected end tag', 6),
+             ('<a> 1 </a> 2', 'value outside of an element', 11),
+             ('<a><b> 1 </b>', 'unexpected end of input', 13),
+             ('', 'empty document', 0),
+             ('<a><b> 1 </b><> 2 </></a>', 'anonymous member in an object', 13),
+             ('<a><> 1 </><b> 2 </b></a>', 'named member in an array', 11),
+             ('<a> </a>', 'missing value', 4),
+             ('<a> 1 2 </a>', 'unexpected value after a value', 6)]
+    for bad, msg, pos in cases:
+        with pytest.raises(zml.ZmlDecodeError) as info:
+            zml.loads(bad, lazy=True)['a']
+        assert (info.value.msg, info.value.pos) == (msg, pos)
+
+
+def test_projection():
+    s = '''
+    <db>
+        <primary><host> "a" </host><port> 1 </port></primary>
+        <replica><host> "b" </host><port> 2 </port></replica>
+    </db>
+    <features><> "x" </><> "y" </></features>
+    <other><db> 1 </db><note> "</other> <db>" </note></other>
+    <scalar> 3 </scalar>
+    '''
+    full = zml.loads(s)
+    for engine in ENGINES:
+        assert zml.loads(s, engine, include=['db.primary', 'features']) == {
+            'db': {'primary': full['db']['primary']},
+            'features': ['x', 'y']}
+        assert zml.loads(s, engine, exclude=['db.replica', 'other']) == {
+            'db': {'primary': full['db']['primary']},
+            'features': ['x', 'y'], 'scalar': 3}
+        assert zml.loads(s, engine, include=['db', 'scalar.x'],
+                         exclude=['db.primary.port']) == {
+            'db': {'primary': {'host': 'a'}, 'replica': full['db']['replica']}}
+        assert zml.loads(s, engine, include=[]) == {}
+    # skipped values are not decoded
+    assert zml.loads('<a> 1 </a><b> 1x </b>', exclude=['b']) == {'a': 1}
+    with pytest.raises(RuntimeError):
+        zml.loads('<a> 1 </a><b><c> 1 </b></c>', exclude=['b'])
+    with pytest.raises(RuntimeError):
+        zml.loads('<a> 1 </a><b> 1 ', exclude=['b'])
+    with pytest.raises(ValueError):
+        zml.loads(s, include=['db..x'])
+    # excluding a path that does not exist never removes data; including
+    # one drops a scalar in the way but keeps empty containers
+    cases = [('5', 5, None), ('empty_obj', {}, {}), ('empty_arr', [], []),
+             ('<b> 1 </b>', {}, {'b': 1}), ('<x> 1 </x>', {'x': 1}, {})]
+    for value, excluded, included in cases:
+        doc = f'<c> {value} </c><d> 1 </d>'
+        for engine in ENGINES:
+            assert zml.loads(doc, engine, exclude=['c.b']) == {
+                'c': excluded, 'd': 1}
+            d = zml.loads(doc, engine, include=['c.b', 'd'])
+            assert d.get('c') == included and d['d'] == 1
+
+
+def test_numeric_arrays():
+    from array import array
+    s = '''
+    <i><> 1 </><> 2_000 </></i>
+    <f><> 1.5 </><> 2.0 </></f>
+    <mixed><> 1 </><> 2.0 </></mixed>
+    <big><> 1 </><> 100000000000000000000 </></big>
+    <flags><> true </><> false </></flags>
+    <nested><><> 1 </></><><k><> 3.0 </></k></></nested>
+    '''
+    d = zml.loads(s, numeric_arrays='array')
+    assert d['i'] == array('q', [1, 2000]) and d['f'] == array('d', [1.5, 2.0])
+    assert d['mixed'] == [1, 2.0] and d['big'][1] == 10 ** 20
+    assert d['flags'] == [True, False]
+    assert d['nested'][0] == array('q', [1])
+    assert d['nested'][1] == {'k': array('d', [3.0])}
+    assert zml.loads(zml.dumps(d)) == zml.loads(s)
+    assert zml.loads(s) == zml.loads(s, numeric_arrays=None)
+    with pytest.raises(ValueError):
+        zml.loads(s, numeric_arrays='list')
+    np = pytest.importorskip('numpy')
+    d = zml.loads(s, numeric_arrays='numpy')
+    assert d['i'].dtype == np.int64 and d['f'].tolist() == [1.5, 2.0]
+    assert zml.loads(zml.dumps(d)) == zml.loads(s)
+
+
+def test_hooks():
+    from decimal import Decimal
+    s = '''<a> 1_0 </a><b> 0.1_0 </b><c> null </c>
+    <d><><x> true </x></><> empty_obj </></d>'''
+    for engine in ENGINES:
+        d = zml.loads(s, engine, parse_int=str, parse_float=Decimal,
+                      parse_constant=str.upper)
+        assert d == {'a': '10', 'b': Decimal('0.10'), 'c': 'NULL',
+                     'd': [{'x': 'TRUE'}, {}]}
+        seen = []
+        d = zml.loads(s, engine, object_hook=lambda o: seen.append(o) or len(o))
+        assert d == 4 and seen[-1] == {'a': 10, 'b': 0.1, 'c': None,
+                                       'd': [1, 0]}
+        d = zml.loads(s, engine, object_pairs_hook=tuple,
+                      object_hook=lambda o: 1 / 0)
+        assert d[3] == ('d', [(('x', True),), ()])
+        # the pairs hook sees every member, duplicate keys included
+        s2 = '<a> 1 </a><b><x> 1 </x><x><y> 2 </y><y> 3 </y></x></b><a> 2 </a>'
+        assert zml.loads(s2, engine, object_pairs_hook=list) == [
+            ('a', 1), ('b', [('x', 1), ('x', [('y', 2), ('y', 3)])]),
+            ('a', 2)]
+    assert pickle.loads(pickle.dumps(zml.zml._Pairs([('a', 1), ('a', 2)]))
+                        ).pairs == [('a', 1), ('a', 2)]
+    with StringIO(s) as fp:
+        assert zml.load(fp, parse_float=Decimal)['b'] == Decimal('0.10')
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_load_many(tmp_path, executor):
+    docs = {str(tmp_path / f'{i}.zml'): {'i': i, 's': [str(i)]}
+            for i in range(10)}
+    assert all(e is None for _, e in zml.dump_many(
+        docs.items(), workers=2, executor=executor, chunksize=3))
+    bad = str(tmp_path / 'bad.zml')
+    with open(bad, 'w') as f:
+        f.write('<a> 1 ')
+    paths = list(docs) + [bad, str(tmp_path / 'missing.zml')]
+    results = list(zml.load_many(paths, workers=2, executor=executor))
+    assert [p for p, _, _ in results] == paths
+    assert [d for _, d, _ in results[:10]] == list(docs.values())
+    assert isinstance(results[10][2], RuntimeError)
+    assert isinstance(results[11][2], FileNotFoundError)
+    results = zml.load_many(paths, executor=executor, ordered=False,
+                            chunksize=1, include=['i'])
+    assert sorted((p, d) for p, d, e in results if e is None) == sorted(
+        (p, {'i': d['i']}) for p, d in docs.items())
+    with pytest.raises(ValueError):
+        zml.load_many(paths, executor='fiber')
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_loads_parallel(executor):
+    from zen_markup_lang.batch import _split
+    s = ''.join(f'<k{i}><a><a> {i} </a></a><s> "</a> #" </s></k{i}> # <x>\n'
+                for i in range(20)) + '<k3> 1.5 </k3>'
+    assert ''.join(_split(s, 4)) == s and len(_split(s, 4)) == 4
+    for kw in ({}, {'include': ['k1', 'k19.a']},
+               {'object_pairs_hook': list, 'numeric_arrays': 'array'}):
+        assert zml.loads_parallel(s, 4, executor, 1, **kw) == zml.loads(s, **kw)
+    d = zml.loads_parallel(s, 4, executor, 1)
+    assert list(d) == list(zml.loads(s))
+    # a cut inside a string is caught and the document parsed as a whole
+    s = '<a> 1 </a><b> "</b><c>" </b><c> 2 </c>'
+    assert zml.loads_parallel(s, 3, executor, 1) == zml.loads(s)
+    with pytest.raises(RuntimeError, match='line 2'):
+        zml.loads_parallel('<a> 1 </a>\n<b> 2x </b>', 2, executor, 1)
+
+
+def test_load_path(tmp_path):
+    s = '''# é
+    <a> "ü\\n\\"€" `raw é` </a><b><> 1_000 </><> 2.5 </></b>
+    <c><d> "</c>" </d></c>
+    '''
+    path = tmp_path / 'a.zml'
+    path.write_text(s, encoding='utf-8')
+    assert zml.load_path(path) == zml.loads(s)
+    assert zml.load_path(str(path), include=['c'], parse_int=str) == {
+        'c': {'d': '</c>'}}
+    with open(path, 'rb') as f:
+        assert zml.load(f, engine='bytes') == zml.loads(s)
+    path.write_text(s + '<e> é </e>', encoding='utf-8')
+    with pytest.raises(RuntimeError, match='illegal character é in line 4'):
+        zml.load_path(path)
+    path.write_text('')
+    with pytest.raises(RuntimeError, match='empty document'):
+        zml.load_path(path)
+
+
+def test_aload():
+    import asyncio
+    import time
+    s = ''.join(f'<k{i}><> "é{i}" </><> {i} </></k{i}>\n' for i in range(10000))
+    start = time.perf_counter()
+    expected = zml.loads(s)
+    parse_time = time.perf_counter() - start
+
+    def stream(data):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return reader
+
+    async def ticker(gaps, done):
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    async def main():
+        done = asyncio.Event()
+        # a single line is parsed in steps too
+        for text, kw in ((s, {'chunk_size': 4096}), (s, {'in_executor': True}),
+                         (s.replace('\n', ' '), {})):
+            gaps = []
+            task = asyncio.ensure_future(ticker(gaps, done))
+            d = await zml.aload(stream(text.encode()), **kw)
+            done.set()
+            await task
+            done.clear()
+            assert d == expected
+            # the loop kept running while the document was parsed
+            assert len(gaps) > 10 and max(gaps) < parse_time / 4
+        d = await zml.aload(stream(b'<a> 1 </a><b> 2 </b>'), include=['b'],
+                            parse_int=str)
+        assert d == {'b': '2'}
+        # the skipped elements span several chunks and lines
+        t = zml.dumps({'a': {'x': 1, 'y': [1, 2]}, 'b': 2, 'c': {'z': [{}]}})
+        for kw in ({'include': ['b']}, {'exclude': ['a', 'c.z']}):
+            expected_part = zml.loads(t, **kw)
+            for chunk_size in (1, 8, 4096):
+                d = await zml.aload(stream(t.encode()), chunk_size=chunk_size,
+                                    **kw)
+                assert d == expected_part
+        for bad in (t.replace('</y>', '</z>'), t[:30]):
+            with pytest.raises(zml.ZmlDecodeError) as loads_error:
+                zml.loads(bad, include=['b'])
+            with pytest.raises(zml.ZmlDecodeError) as aload_error:
+                await zml.aload(stream(bad.encode()), include=['b'],
+                                chunk_size=8)
+            assert str(aload_error.value) == str(loads_error.value)
+
+        class Writer:
+            def __init__(self):
+                self.data = b''
+
+            def write(self, data):
+                self.data += data
+
+            async def drain(self):
+                pass
+
+        # a single top-level member is written in steps too
+        d = {'root': expected}
+        start = time.perf_counter()
+        text = zml.dumps(d)
+        dump_time = time.perf_counter() - start
+        for kw in ({}, {'in_executor': True}):
+            writer = Writer()
+            gaps = []
+            task = asyncio.ensure_future(ticker(gaps, done))
+            await zml.adump(d, writer, **kw)
+            done.set()
+            await task
+            done.clear()
+            assert writer.data.decode() == text
+            if not kw:
+                assert len(gaps) > 10 and max(gaps) < dump_time / 4
+
+    asyncio.run(main())
+
+
+def test_cache(tmp_path):
+    import os
+    paths = [tmp_path / f'{i}.zml' for i in range(3)]
+    for i, path in enumerate(paths):
+        path.write_text(f'<a><> {i} </><> "x" </></a>')
+    cache = zml.ZmlCache(max_entries=2)
+    d = cache.load(paths[0])
+    d['a'].append(1)
+    assert cache.load(paths[0]) == {'a': [0, 'x']}
+    assert (cache.hits, cache.misses) == (1, 1)
+    # a change of size, or of mtime, is noticed
+    st = os.stat(paths[0])
+    paths[0].write_text('<a> 10 </a>')
+    assert cache.load(paths[0]) == {'a': 10}
+    # a change that keeps the stat signature needs verify_hash
+    paths[0].write_text('<a> 11 </a>')
+    os.utime(paths[0], ns=(st.st_atime_ns, os.stat(paths[0]).st_mtime_ns))
+    hashed = zml.ZmlCache(verify_hash=True)
+    assert hashed.load(paths[0]) == {'a': 11}
+    assert hashed.load(paths[0]) == {'a': 11} and hashed.hits == 1
+    # LRU eviction
+    cache.load(paths[1])
+    cache.load(paths[0])
+    cache.load(paths[2])
+    assert len(cache) == 2 and cache.misses == 5
+    cache.load(paths[0])
+    assert cache.misses == 5
+    cache.load(paths[1])
+    assert cache.misses == 6
+    small = zml.ZmlCache(max_bytes=os.path.getsize(paths[1]) + 1)
+    small.load(paths[1])
+    small.load(paths[2])
+    assert len(small) == 1
+    # policies
+    frozen = zml.ZmlCache(policy='frozen')
+    d = frozen.load(paths[1])
+    assert d['a'] == (1, 'x') and frozen.load(paths[1]) is d
+    with pytest.raises(TypeError):
+        d['b'] = 1
+    shared = zml.ZmlCache(policy='shared', numeric_arrays='array')
+    assert shared.load(paths[1]) is shared.load(paths[1])
+    copied = zml.ZmlCache(numeric_arrays='array')
+    paths[2].write_text('<a><> 1 </><> 2 </></a>')
+    d = copied.load(paths[2])
+    assert d is not copied.load(paths[2]) and d['a'].typecode == 'q'
+    assert zml.load_cached(paths[2]) == {'a': [1, 2]}
+    with pytest.raises(ValueError):
+        zml.ZmlCache(policy='weak')
+
+
+def test_disk_cache(tmp_path):
+    import os
+    from zen_markup_lang import disk_cache
+    path = tmp_path / 'a.zml'
+    path.write_text('<a><> 1 </><> "é" </></a><b> 2 </b>', encoding='utf-8')
+    cached = disk_cache.cache_path(path)
+    assert cached == str(tmp_path / '__zmlcache__' / 'a.zml.zmlc')
+    assert zml.load_path(path, cache=True) == {'a': [1, 'é'], 'b': 2}
+    mtime = os.stat(cached).st_mtime_ns
+    # a hit leaves the cache file alone, other options get their own entry
+    assert zml.load_path(path, cache=True) == {'a': [1, 'é'], 'b': 2}
+    assert os.stat(cached).st_mtime_ns == mtime
+    assert zml.load_path(path, cache=True, include=['b']) == {'b': 2}
+    # edits, corrupt and foreign cache files are not used and replaced
+    path.write_text('<a> 3 </a>')
+    assert zml.load_path(path, cache=True) == {'a': 3}
+    for junk in (b'', b'ZMLC\x00garbage', open(cached, 'rb').read()[:-3]):
+        with open(cached, 'wb') as f:
+            f.write(junk)
+        assert zml.load_path(path, cache=True) == {'a': 3}
+    assert disk_cache.read(cached, disk_cache.make_key(
+        path.read_bytes(), {'include': None, 'exclude': None})) == {'a': 3}
+    # a separate cache directory
+    other = tmp_path / 'cache'
+    assert zml.load_path(path, cache=other) == {'a': 3}
+    assert [p.suffix for p in other.iterdir()] == ['.zmlc']
+    with pytest.raises(ValueError):
+        zml.load_path(path, cache=True, parse_int=str)
+    # an unwritable cache location is ignored
+    assert zml.load_path(path, cache=path / 'x') == {'a': 3}
+
+
+def test_reparse():
+    s = '<a><b> 1 </b><c><> "x" </><><d> 3 </d></></c></a>\n<e> empty_obj </e>'
+    doc = zml.ZmlDocument(s)
+    c = doc.tree['a']['c']
+    zml.reparse(doc, (s.index('3'), s.index('3') + 1, '30'))
+    # only the innermost element is replaced, the rest of the tree is kept
+    assert doc.tree['a']['c'] is c and c[1] == {'d': 30}
+    with pytest.raises(RuntimeError):
+        doc.edit(0, 3, '<x>')
+    assert doc.tree['a']['c'] is c and doc.text == s.replace('3', '30')
+    with pytest.raises(ValueError):
+        doc.edit(5, 4, '')
+    # an edit cannot close the element it is parsed in
+    doc = zml.ZmlDocument('<a> 1 </a><b> 2 </b>')
+    with pytest.raises(RuntimeError):
+        doc.edit(4, 5, '1 </_><_> 9')
+    assert doc.tree == {'a': 1, 'b': 2} and doc.text == '<a> 1 </a><b> 2 </b>'
+    # random edits give the same tree as parsing the edited text
+    snippets = ['', ' ', '1', '"x"', '<b> 2 </b>', '<> 3 </>', '<>', '</>',
+                '<c>', '</c>', '# c\n', 'empty_arr', '<d><> 1 </></d>',
+                '</c><c>', '</_><_>', '1 </d><d> 9']
+    for seed in range(40):
+        rnd = random.Random(seed)
+        doc = zml.ZmlDocument(s)
+        text = s
+        for _ in range(20):
+            start = rnd.randrange(len(text) + 1)
+            end = min(len(text), start + rnd.choice([0, 1, 3]))
+            new = rnd.choice(snippets)
+            edited = text[:start] + new + text[end:]
+            try:
+                expected = zml.dumps(zml.loads(edited))
+            except RuntimeError:
+                with pytest.raises(RuntimeError):
+                    doc.edit(start, end, new)
+                continue
+            doc.edit(start, end, new)
+            assert zml.dumps(doc.tree) == expected
+            text = edited
+        assert doc.text == text
+
+
+@pytest.mark.parametrize('watcher', ['poll', 'auto'])
+def test_config_store(tmp_path, watcher):
+    import os
+    import threading
+    from zen_markup_lang import cache
+    path = tmp_path / 'app.zml'
+    path.write_text('<db><pool><size> 1 </size></pool><host> "a" </host></db>'
+                    '<x><> 1 </></x>')
+    store = zml.ConfigStore(path, interval=0.02, settle=0.01, watcher=watcher)
+    old = store.snapshot
+    assert store.get('db.pool.size') == 1 and store.get('db.nope', 3) == 3
+    with pytest.raises(TypeError):
+        old['db']['host'] = 'b'
+    calls = {'db.pool': [], 'x': [], 'db.pool.size': [], 'y': []}
+    for key, log in calls.items():
+        store.subscribe(key, lambda a, b, log=log: log.append((a, b)))
+    assert not store.reload()
+    path.write_text('<db><pool><size> 2 </size></pool><host> "a" </host></db>'
+                    '<x><> 1 </></x><y> true </y>')
+    assert store.reload()
+    new = store.snapshot
+    assert new['db']['pool']['size'] == 2 and old['db']['pool']['size'] == 1
+    # unchanged subtrees are shared, only the changed paths are notified
+    assert new['x'] is old['x']
+    assert calls == {'db.pool': [({'size': 1}, {'size': 2})], 'x': [],
+                     'db.pool.size': [(1, 2)], 'y': [(None, True)]}
+    # a broken file keeps the last good snapshot
+    path.write_text('<db> 1 ')
+    with pytest.raises(RuntimeError):
+        store.reload()
+    assert store.snapshot is new and not store.reload()
+    # equal values of other types are changes, also inside arrays
+    for x in ('<> true </>', '<> 1.0 </>', '<><a> 1.0 </a></>',
+              '<><a> 1 </a></>'):
+        path.write_text(f'<db> 1 </db><x>{x}</x>')
+        assert store.reload(force=True)
+        assert repr(store.get('x')[0]) == repr(
+            cache._freeze(zml.load_path(path)['x'][0]))
+    assert [after for _, after in calls['x'][-4:]] == [
+        (True,), (1.0,), ({'a': 1.0},), ({'a': 1},)]
+    new = store.snapshot
+    # the watcher thread picks changes up by itself
+    changed = threading.Event()
+    unsubscribe = store.subscribe('db', lambda a, b: changed.set())
+    with store:
+        tmp = tmp_path / 'app.tmp'
+        tmp.write_text('<db> 3 </db>')
+        os.replace(tmp, path)
+        assert changed.wait(5)
+    assert store.get('db') == 3 and store.last_error is None
+    unsubscribe()
+
+
+def test_compile_loader():
+    import dataclasses
+    from typing import Any, Dict, List, Optional, TypedDict, Union
+
+    @dataclasses.dataclass
+    class Server:
+        host: str
+        port: int = 80
+        weight: float = 1.0
+
+    class Pool(TypedDict, total=False):
+        size: int
+        name: Optional[str]
+
+    @dataclasses.dataclass
+    class Config:
+        servers: List[Server]
+        pools: Dict[str, Pool]
+        limits: {'cpu': Union[int, str], 'tags': List[List[int]]}
+        extra: Any = None
+        backup: Optional[Server] = None
+        names: List[str] = dataclasses.field(default_factory=list)
+
+    s = '''<servers><><host> "a" `b` </host><weight> 2 </weight></>
+                      <><host> "c" </host><port> 8080 </port><x> 1 </x></>
+           </servers>
+           <pools><p1><size> 3 </size><name> null </name></p1><p2> empty_obj </p2></pools>
+           <limits><cpu> "max" </cpu><tags><><> 1 </><> 2 </></><> empty_arr </></tags></limits>
+           <skipped><a> 1 </a></skipped>
+           <extra><a><> 1 </><> "x" </></a></extra>'''
+    expected = Config([Server('ab', 80, 2.0), Server('c', 8080)],
+                      {'p1': {'size': 3, 'name': None}, 'p2': {}},
+                      {'cpu': 'max', 'tags': [[1, 2], []]}, {'a': [1, 'x']})
+    for engine in ENGINES:
+        load = zml.compile_loader(Config, engine)
+        assert load(s) == expected
+        assert zml.compile_loader(Config, engine) is load
+    assert zml.compile_loader(Dict[str, int])('<a> 1 </a><b> 2 </b>') == {
+        'a': 1, 'b': 2}
+    load = zml.compile_loader(Config)
+    cases = [('<servers> empty_arr </servers><limits><cpu> 1 </cpu></limits>',
+              'missing member tags', ('limits',)),
+             ('<servers><><host> 1 </host></></servers>', 'expected a string',
+              ('servers', 0, 'host')),
+             ('<servers><><host> "a" </host><port> 1 </oops></></servers>',
+              'unexpected end tag', ('servers', 0, 'port')),
+             ('<servers><a> 1 </a></servers>', 'named member in an array',
+              ('servers', 0)),
+             ('<servers> empty_arr </servers><pools> 1 </pools>',
+              'expected an object', ('pools',)),
+             ('<servers> empty_arr </servers>', 'missing member pools', ()),
+             ('', 'empty document', ())]
+    for s, msg, path in cases:
+        with pytest.raises(zml.ZmlDecodeError) as info:
+            load(s)
+        assert (info.value.msg, info.value.path) == (msg, path)
+    # tags are not spliced into the generated source
+    for tag in ("it's", 'a\\', "y') or __import__('os').getpid() or ('"):
+        with pytest.raises(zml.ZmlDecodeError) as info:
+            zml.compile_loader({tag: int, 'b': int})('<b> 1 </b>')
+        assert info.value.msg == f'missing member {tag}'
+    with pytest.raises(TypeError):
+        zml.compile_loader(List[int])
+    with pytest.raises(TypeError):
+        zml.compile_loader({'a': Union[List[int], Dict[str, int]]})
+
+
+def test_compile_validator():
+    import dataclasses
+    from typing import Any, Dict, List, Optional, Union
+    from zen_markup_lang.cache import _freeze
+
+    @dataclasses.dataclass
+    class Server:
+        host: str
+        port: int = 80
+        weight: float = 1.0
+
+    @dataclasses.dataclass
+    class Config:
+        servers: List[Server]
+        limits: Dict[str, Union[int, str]]
+        backup: Optional[Server] = None
+        extra: Any = None
+
+    s = '''<servers><><host> "a" `b` </host><weight> 2 </weight></>
+                      <><host> "c" </host><x><> 1 </></x></></servers>
+           <limits><cpu> 1 </cpu><mem> "1G" </mem></limits>
+           <other> 1.5 </other>'''
+    validator = zml.compile_validator(Config)
+    assert zml.compile_validator(Config) is validator
+    for engine in ENGINES:
+        assert validator.loads(s, engine) == zml.loads(s)
+    assert validator.load(StringIO(s)) == zml.loads(s)
+    tree = zml.loads(s)
+    assert validator.errors(tree) == []
+    assert validator.validate(tree) is tree
+    assert validator.errors(_freeze(tree)) == []
+
+    bad = '''<servers><><host> 1 </host><port> 1.5 </port></>
+                      <><weight> true </weight></></servers>
+             <limits><cpu> null </cpu></limits>
+             <backup><host> "b" </host></backup>'''
+    assert validator.errors(zml.loads(bad)) == [
+        (('servers', 0, 'host'), 'expected a string'),
+        (('servers', 0, 'port'), 'expected an int'),
+        (('servers', 1), 'missing member host'),
+        (('servers', 1, 'weight'), 'expected a float'),
+        (('limits', 'cpu'), 'expected an int or a string')]
+    with pytest.raises(zml.ZmlSchemaError) as info:
+        validator.validate(zml.loads(bad))
+    assert len(info.value.errors) == 5
+    assert str(info.value).startswith(
+        'expected a string at servers.0.host; expected an int at')
+    assert validator.errors({'servers': 1}) == [
+        (('servers',), 'expected an array'), ((), 'missing member limits')]
+    with pytest.raises(zml.ZmlDecodeError) as info:
+        validator.loads(bad)
+    e = info.value
+    assert (e.msg, e.path, e.lineno, e.colno) == (
+        'expected a string', ('servers', 0, 'host'), 1, 19)
+    with pytest.raises(TypeError):
+        zml.compile_validator(List[int])
+
+
+def test_is_valid():
+    docs = ['<a><> 1 </><> "x\\n" `y` </><><b> 1.5 </b></></a>\n# end\n',
+            '<a> empty_obj </a><b><c><d> 1_0.5 </d></c></b>',
+            (HERE / 'test.zml').read_text(),
+            zml.dumps(zml.loads((HERE / 'test.zml').read_text()))]
+    for s in docs:
+        assert zml.is_valid(s) and zml.is_valid(s.encode())
+        zml.validate(StringIO(s))
+    cases = ['', '<a> 1 2 </a>', '<a> 01 </a>', '<a> truex </a>', '<a></a>',
+             '<a><> 1 </><b> 1 </b></a>', '<a><b> 1 </b></c>', '<a> 1 </a> 1',
+             '<a> "\\q" </a>', '<a> 1 </a><b>', '<> 1 </>', '<a> 1 </a>\n#']
+    for s in cases:
+        assert not zml.is_valid(s) and not zml.is_valid(s.encode())
+        with pytest.raises(zml.ZmlDecodeError) as info:
+            zml.validate(StringIO(s))
+        with pytest.raises(zml.ZmlDecodeError) as expected:
+            zml.loads(s)
+        e, f = info.value, expected.value
+        assert (e.msg, e.pos, e.path) == (f.msg, f.pos, f.path)
+    assert not zml.is_valid(b'<a> "\xff" </a>')
+
+
+def test_import_is_light():
+    # the features that need them load these modules on first use
+    heavy = ('asyncio', 'multiprocessing', 'concurrent.futures', 'ctypes',
+             'select', 'hashlib', 'tempfile', 'dataclasses')
+    code = ('import sys, zen_markup_lang; print(*sorted(set(sys.modules) & '
+            f'{set(heavy)!r}))')
+    src = str(pathlib.Path(zml.__file__).resolve().parent.parent)
+    out = subprocess.run([sys.executable, '-c', code], cwd=src, check=True,
+                         stdout=subprocess.PIPE, universal_newlines=True)
+    assert out.stdout.split() == []
+    assert zml.aload and zml.ZmlCache and 'ConfigStore' in dir(zml)
+    with pytest.raises(AttributeError):
+        zml.nope